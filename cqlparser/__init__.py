@@ -27,9 +27,15 @@
 #
 ## end license ##
 
-from ._cqlexception import UnsupportedCQL, CQLParseException, CQLTokenizerException, CQLException
-from .cqlparser import parseString, CQL_QUERY, SCOPED_CLAUSE, SEARCH_CLAUSE, BOOLEAN, SEARCH_TERM, INDEX, TERM, COMPARITOR, DEFAULTCOMPARITORS
-from .cqlvisitor import CqlVisitor
+from ._cqlexception import UnsupportedCQL, CQLParseException, CQLTokenizerException, CQLException, CQLLimitException, CQLLengthLimitException, CQLTokenLimitException, CQLNestingLimitException, CQLSearchClauseLimitException
+from .cqlparser import parseString, validate, ParserProfile, CqlBuilder, InterningCqlBuilder, CQL_QUERY, SCOPED_CLAUSE, SEARCH_CLAUSE, BOOLEAN, SEARCH_TERM, INDEX, TERM, COMPARITOR, DEFAULTCOMPARITORS
+from .cqlvisitor import CqlVisitor, CqlWalker
 from .cqlidentityvisitor import CqlIdentityVisitor
 from .cql2string import cql2string, quotTerm
-from .cqltoexpression import cqlToExpression, QueryExpression
+from .cqltoexpression import cqlToExpression, QueryExpression, ExpressionBuilder
+from .expressiontocql import expressionToCql
+from .parsecache import ParseCache
+from .compactcql import CompactCql, CompactCqlBuilder
+from .binarycql import dumps, loads
+from .rewrite import rewrite
+from .queryshape import parameterize, QueryShape, prepare, CqlTemplate
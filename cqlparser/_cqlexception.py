@@ -27,10 +27,14 @@
 ## end license ##
 
 class CQLException(Exception):
-    pass
+    def __init__(self, message, offset=None):
+        Exception.__init__(self, message)
+        self.offset = offset
 
 class CQLTokenizerException(CQLException):
-    pass
+    def __init__(self, message, offset=None, character=None):
+        CQLException.__init__(self, message, offset=offset)
+        self.character = character
 
 class UnsupportedCQL(CQLException):
     def __call__(self, *ignoredArgs):
@@ -38,3 +42,20 @@ class UnsupportedCQL(CQLException):
 
 class CQLParseException(CQLException):
     pass
+
+class CQLLimitException(CQLException):
+    def __init__(self, message, offset=None, limit=None):
+        CQLException.__init__(self, message, offset=offset)
+        self.limit = limit
+
+class CQLLengthLimitException(CQLLimitException):
+    pass
+
+class CQLTokenLimitException(CQLLimitException):
+    pass
+
+class CQLNestingLimitException(CQLLimitException):
+    pass
+
+class CQLSearchClauseLimitException(CQLLimitException):
+    pass
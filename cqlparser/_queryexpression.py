@@ -26,16 +26,41 @@
 #
 ## end license ##
 
+from hashlib import blake2b
+from operator import attrgetter
+
 from .cql2string import quottableTermChars
 
 
+_ATTRIBUTES = ('operator', 'relation_boost', 'must_not', 'index', 'relation', 'term', 'operands')
+_SEARCHTERM_KEY = ('operator', 'relation_boost', 'must_not', 'index', 'relation', 'term')
+_NESTED_KEY = ('operator', 'relation_boost', 'must_not')
+_searchtermKey = attrgetter(*_SEARCHTERM_KEY)
+_nestedKey = attrgetter(*_NESTED_KEY)
+_ABSENT = object()
+_new = object.__new__
+
+
 class QueryExpression(object):
-    def __init__(self, **kwargs):
-        self.operator = None
-        self.relation_boost = None
-        self.must_not = False
-        for k,v in kwargs.items():
-            setattr(self, k, v)
+    """
+    A search term with index, relation and term, or a nested expression with
+    operator and operands. Attributes live in slots, an attribute that is not
+    set is absent, as in asDict and repr.
+    """
+    __slots__ = _ATTRIBUTES
+
+    def __init__(self, operator=None, relation_boost=None, must_not=False, index=_ABSENT, relation=_ABSENT, term=_ABSENT, operands=_ABSENT):
+        self.operator = operator
+        self.relation_boost = relation_boost
+        self.must_not = must_not
+        if index is not _ABSENT:
+            self.index = index
+        if relation is not _ABSENT:
+            self.relation = relation
+        if term is not _ABSENT:
+            self.term = term
+        if operands is not _ABSENT:
+            self.operands = operands
 
     @classmethod
     def nested(cls, operator):
@@ -43,10 +68,7 @@ class QueryExpression(object):
 
     @classmethod
     def searchterm(cls, index=None, relation=None, term=None, boost=None):
-        result = cls(index=index, relation=relation, term=term)
-        if boost is not None:
-            result.relation_boost = boost
-        return result
+        return cls(index=index, relation=relation, term=term, relation_boost=boost)
 
     def isNested(self):
         return self.operator is not None
@@ -55,14 +77,44 @@ class QueryExpression(object):
         return not self.isNested()
 
     def __eq__(self, other):
-        return isinstance(other, QueryExpression) and self.__dict__ == other.__dict__
+        """
+        Expressions are equal when their _key()s are and, when nested, their
+        operands are, compared with an explicit stack.
+        """
+        if not isinstance(other, QueryExpression):
+            return False
+        try:
+            return _equalExpressions(self, other)
+        except AttributeError:
+            return _equalKeys(self, other)
 
     def __ne__(self, other):
         return not self.__eq__(other)
 
+    def __hash__(self):
+        """
+        Structural hash, consistent with ==. It is computed on every call since
+        expressions are changed in place, for example with replaceWith.
+        """
+        hashes = {}
+        for expression in reversed(list(self.iter())):
+            hashes[id(expression)] = hash((
+                expression._key(),
+                tuple(hashes[id(operand)] for operand in expression.operands) if expression.operator else None))
+        return hashes[id(self)]
+
+    def fingerprint(self):
+        """Returns a hexadecimal 128 bit blake2b digest of the expression, the same in every process."""
+        parts = []
+        for expression in self.iter():
+            parts.append(';'.join('%s=%r' % item for item in sorted(expression._attributes()) if item[0] != 'operands'))
+            if expression.operator:
+                parts.append('/%d' % len(expression.operands))
+        return blake2b('\n'.join(parts).encode('utf-8'), digest_size=16).hexdigest()
+
     def asDict(self):
         result = {}
-        for k, v in self.__dict__.items():
+        for k, v in self._attributes():
             if k == 'operands':
                 result['operands'] = [expr.asDict() for expr in v]
             else:
@@ -77,17 +129,29 @@ class QueryExpression(object):
             result.operands = [cls.fromDict(o) for o in operands]
         return result
 
+    def copy(self):
+        result = self._shallowCopy()
+        stack = [result]
+        while stack:
+            expression = stack.pop()
+            if expression.operator:
+                expression.operands = [operand._shallowCopy() for operand in expression.operands]
+                stack.extend(expression.operands)
+        return result
+
     def iter(self):
-        yield self
-        if self.operator:
-            for operand in self.operands[:]:
-                for f in operand.iter():
-                    yield f
+        stack = [self]
+        while stack:
+            expression = stack.pop()
+            yield expression
+            if expression.operator:
+                stack.extend(reversed(expression.operands))
 
     def replaceWith(self, expression):
-        for k in list(self.__dict__.keys()):
+        attributes = expression._attributes()
+        for k, v in self._attributes():
             delattr(self, k)
-        for k,v in expression.__dict__.items():
+        for k, v in attributes:
             setattr(self, k, v)
 
     def toString(self, pretty_print=True):
@@ -97,7 +161,35 @@ class QueryExpression(object):
         return ''.join(self._str())
 
     def __repr__(self):
-        return '%s(%s)' % (self.__class__.__name__, ', '.join("%s=%s" % (key, repr(value)) for key, value in sorted(self.__dict__.items())))
+        return '%s(%s)' % (self.__class__.__name__, ', '.join("%s=%s" % (key, repr(value)) for key, value in sorted(self._attributes())))
+
+    def _key(self):
+        """
+        The attributes that matter for ==: operator, relation_boost and must_not,
+        for a search term also index, relation and term.
+        """
+        try:
+            return _nestedKey(self) if self.operator else _searchtermKey(self)
+        except AttributeError:
+            return tuple(getattr(self, name, _ABSENT) for name in (_NESTED_KEY if getattr(self, 'operator', None) else _SEARCHTERM_KEY))
+
+    def _attributes(self):
+        """The attributes that are set, as (name, value) pairs."""
+        attributes = []
+        for name in _ATTRIBUTES:
+            value = getattr(self, name, _ABSENT)
+            if value is not _ABSENT:
+                attributes.append((name, value))
+        return attributes
+
+    def _shallowCopy(self):
+        """A copy that shares the operands list."""
+        result = _new(self.__class__)
+        for name in _ATTRIBUTES:
+            value = getattr(self, name, _ABSENT)
+            if value is not _ABSENT:
+                setattr(result, name, value)
+        return result
 
     def _str(self, indent=None):
         if self.must_not:
@@ -126,3 +218,45 @@ class QueryExpression(object):
             if quottableTermChars.search(term):
                 term = '"%s"' % term.replace(r'"', r'\"')
             yield repr(' '.join(r for r in [self.index, self.relation, term] if r))
+
+
+def _equalExpressions(expression, other):
+    """Compares the attributes directly, AttributeError means one is absent."""
+    if not expression.operator:
+        return _equalSearchterms(expression, other)
+    pairs = [(expression, other)]
+    for expression, other in pairs:
+        if not (expression.operator == other.operator and expression.must_not == other.must_not and expression.relation_boost == other.relation_boost):
+            return False
+        operands, otherOperands = expression.operands, other.operands
+        if len(operands) != len(otherOperands):
+            return False
+        for operand, other in zip(operands, otherOperands):
+            if operand.operator:
+                pairs.append((operand, other))
+            elif not _equalSearchterms(operand, other):
+                return False
+    return True
+
+def _equalSearchterms(expression, other):
+    return expression.term == other.term and expression.index == other.index and expression.relation == other.relation and \
+        expression.must_not == other.must_not and expression.relation_boost == other.relation_boost and expression.operator == other.operator
+
+def _equalKeys(expression, other):
+    stack = [(expression, other)]
+    while stack:
+        expression, other = stack.pop()
+        if expression is other:
+            continue
+        if not isinstance(other, QueryExpression) or expression._key() != other._key():
+            return False
+        if getattr(expression, 'operator', None):
+            operands, otherOperands = getattr(expression, 'operands', _ABSENT), getattr(other, 'operands', _ABSENT)
+            if operands is _ABSENT or otherOperands is _ABSENT:
+                if operands is not otherOperands:
+                    return False
+            elif len(operands) != len(otherOperands):
+                return False
+            else:
+                stack.extend(zip(operands, otherOperands))
+    return True
@@ -0,0 +1,267 @@
+## begin license ##
+#
+# "CQLParser" is a parser that builds a parsetree for the given CQL and can convert this into other formats.
+#
+# Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+#
+# This file is part of "CQLParser"
+#
+# "CQLParser" is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# "CQLParser" is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with "CQLParser"; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+## end license ##
+
+from array import array
+from struct import Struct
+from sys import byteorder
+
+from .cqlparser import CQLAbstractSyntaxNode
+from .compactcql import NODES, KINDS, FIRST_TERMINAL
+from ._queryexpression import QueryExpression, _ATTRIBUTES
+
+MAGIC = b'CQLB'
+VERSION = 1
+TREE, EXPRESSION = b'T', b'E'
+_HEADER = Struct('<4sBc2sII')
+
+# value tags of expression attributes, the tag is in the lowest two bits
+_STRING, _FLOAT, _INT, _CONSTANT = range(4)
+_CONSTANTS = [None, False, True]
+# expression attributes are set straight through their slots
+_SETTERS = {name: getattr(QueryExpression, name).__set__ for name in _ATTRIBUTES}
+_ITEMSIZES = {typecode: array(typecode).itemsize for typecode in 'BHI'}
+
+
+def dumps(cqlOrExpression):
+    """
+    Returns bytes for a parse tree (or CompactCql) or a QueryExpression; see loads.
+    The format is a versioned header, a string table and a postorder stream of
+    codes: every node is written after its children.
+    """
+    if isinstance(cqlOrExpression, QueryExpression):
+        return _dumps(EXPRESSION, *_expressionCodes(cqlOrExpression))
+    if not isinstance(cqlOrExpression, CQLAbstractSyntaxNode) and hasattr(cqlOrExpression, 'asTree'):
+        cqlOrExpression = cqlOrExpression.asTree()
+    return _dumps(TREE, *_treeCodes(cqlOrExpression))
+
+def loads(data):
+    """
+    Returns the parse tree or QueryExpression that was written with dumps.
+    Equal leaves of a parse tree are shared, like InterningCqlBuilder does.
+    It takes about half the time of parsing the query again, less for long
+    queries; a QueryExpression of a single term is parsed just as fast.
+    """
+    magic, version, what, typecodes, stringCount, codeCount = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError('Not a serialized CQL tree or expression')
+    if version != VERSION:
+        raise ValueError('Unsupported version %d' % version)
+    offset = _HEADER.size
+    lengths, offset = _array(chr(typecodes[0]), data, offset, stringCount)
+    codes, offset = _array(chr(typecodes[1]), data, offset, codeCount)
+    text = str(data[offset:], 'utf-8', 'surrogatepass')
+    if stringCount == 1:
+        strings = [text]
+    else:
+        strings = []
+        start = 0
+        for length in lengths:
+            strings.append(text[start:start + length])
+            start += length
+    if what == TREE:
+        return _loadTree(codes, strings)
+    if what == EXPRESSION:
+        return _loadExpression(codes, strings)
+    raise ValueError('Unknown content %r' % what)
+
+def _treeCodes(root):
+    strings = []
+    stringIndexes = {}
+    codes = []
+    stack = [root]
+    nodes = []
+    while stack:
+        node = stack.pop()
+        nodes.append(node)
+        if KINDS[node.__class__] < FIRST_TERMINAL:
+            stack.extend(node.children)
+    for node in reversed(nodes):
+        kind = KINDS[node.__class__]
+        if kind >= FIRST_TERMINAL:
+            value = node.children[0]
+            index = stringIndexes.get(value)
+            if index is None:
+                index = stringIndexes[value] = len(strings)
+                strings.append(value)
+            codes.append(index << 4 | kind)
+        else:
+            codes.append(len(node.children) << 4 | kind)
+    return strings, codes
+
+def _loadTree(codes, strings):
+    # the last node is kept in top instead of on the stack, most nodes have it as their only child
+    nodes = []
+    append = nodes.append
+    terminals = {}
+    new = object.__new__
+    top = None
+    for code in codes:
+        kind = code & 15
+        if kind >= FIRST_TERMINAL:
+            append(top)
+            top = terminals.get(code)
+            if top is None:
+                top = terminals[code] = NODES[kind](strings[code >> 4])
+            continue
+        node = new(NODES[kind])
+        if code >> 4 == 1:
+            node.children = (top,)
+        else:
+            start = len(nodes) + 1 - (code >> 4)
+            if start < 1:
+                raise ValueError('Corrupt serialized CQL tree')
+            append(top)
+            node.children = tuple(nodes[start:])
+            del nodes[start:]
+        top = node
+    if len(nodes) != 1 or top is None:
+        raise ValueError('Corrupt serialized CQL tree')
+    return top
+
+def _expressionCodes(expression):
+    """
+    Codes are: the attribute name tables, the attribute values and then for every
+    expression its attribute names, operand count + 1 (0 without operands) and values.
+    """
+    strings, stringIndexes = [], {}
+    shapes, shapeIndexes = [], {}
+    values, valueIndexes = [], {}
+    expressions = []
+    stack = [expression]
+    while stack:
+        expression = stack.pop()
+        expressions.append(expression)
+        if hasattr(expression, 'operands'):
+            stack.extend(expression.operands)
+    expressionCodes = []
+    for expression in reversed(expressions):
+        attributes = [(k, v) for k, v in expression._attributes() if k != 'operands']
+        shape = tuple(k for k, v in attributes)
+        index = shapeIndexes.get(shape)
+        if index is None:
+            index = shapeIndexes[shape] = len(shapes)
+            shapes.append(shape)
+        expressionCodes.append(index)
+        expressionCodes.append(len(expression.operands) + 1 if hasattr(expression, 'operands') else 0)
+        for name, value in attributes:
+            key = (value.__class__, value)
+            index = valueIndexes.get(key)
+            if index is None:
+                index = valueIndexes[key] = len(values)
+                values.append(value)
+            expressionCodes.append(index)
+    def stringIndex(value):
+        index = stringIndexes.get(value)
+        if index is None:
+            index = stringIndexes[value] = len(strings)
+            strings.append(value)
+        return index
+    codes = [len(shapes)]
+    for shape in shapes:
+        codes.append(len(shape))
+        codes.extend(stringIndex(name) for name in shape)
+    codes.append(len(values))
+    for value in values:
+        if value is None or value is True or value is False:
+            codes.append(_CONSTANTS.index(value) << 2 | _CONSTANT)
+        elif isinstance(value, str):
+            codes.append(stringIndex(value) << 2 | _STRING)
+        elif isinstance(value, float):
+            codes.append(stringIndex(repr(value)) << 2 | _FLOAT)
+        elif isinstance(value, int):
+            codes.append(stringIndex(str(value)) << 2 | _INT)
+        else:
+            raise TypeError('Cannot serialize %r' % (value,))
+    codes.extend(expressionCodes)
+    return strings, codes
+
+def _loadExpression(codes, strings):
+    shapes = []
+    i = 1
+    for _ in range(codes[0]):
+        count = codes[i]
+        try:
+            shapes.append([_SETTERS[strings[index]] for index in codes[i + 1:i + 1 + count]])
+        except KeyError as e:
+            raise ValueError('Unknown QueryExpression attribute %s' % e)
+        i += 1 + count
+    values = []
+    for code in codes[i + 1:i + 1 + codes[i]]:
+        tag, index = code & 3, code >> 2
+        if tag == _STRING:
+            values.append(strings[index])
+        elif tag == _CONSTANT:
+            values.append(_CONSTANTS[index])
+        elif tag == _FLOAT:
+            values.append(float(strings[index]))
+        else:
+            values.append(int(strings[index]))
+    i += 1 + codes[i]
+    expressions = []
+    new = object.__new__
+    end = len(codes)
+    while i < end:
+        setters, operandCount = shapes[codes[i]], codes[i + 1]
+        i += 2 + len(setters)
+        expression = new(QueryExpression)
+        for set, index in zip(setters, codes[i - len(setters):i]):
+            set(expression, values[index])
+        if operandCount:
+            start = len(expressions) - operandCount + 1
+            expression.operands = expressions[start:]
+            del expressions[start:]
+        expressions.append(expression)
+    if len(expressions) != 1:
+        raise ValueError('Corrupt serialized QueryExpression')
+    return expressions[0]
+
+def _dumps(what, strings, codes):
+    lengths = [len(s) for s in strings]
+    lengths, codes = _packed(lengths), _packed(codes)
+    return b''.join([
+        _HEADER.pack(MAGIC, VERSION, what, (lengths.typecode + codes.typecode).encode('ascii'), len(lengths), len(codes)),
+        lengths.tobytes(),
+        codes.tobytes(),
+        ''.join(strings).encode('utf-8', 'surrogatepass'),
+    ])
+
+def _packed(values):
+    largest = max(values, default=0)
+    result = array('B' if largest < 1 << 8 else 'H' if largest < 1 << 16 else 'I', values)
+    if byteorder == 'big':
+        result.byteswap()
+    return result
+
+def _array(typecode, data, offset, count):
+    """The count values at offset in data, bytes themselves if they fit."""
+    if typecode == 'B':
+        end = offset + count
+        return data[offset:end], end
+    end = offset + count * _ITEMSIZES[typecode]
+    if byteorder == 'little':
+        return memoryview(data)[offset:end].cast(typecode), end
+    result = array(typecode)
+    result.frombytes(data[offset:end])
+    result.byteswap()
+    return result, end
@@ -0,0 +1,169 @@
+## begin license ##
+#
+# "CQLParser" is a parser that builds a parsetree for the given CQL and can convert this into other formats.
+#
+# Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+#
+# This file is part of "CQLParser"
+#
+# "CQLParser" is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# "CQLParser" is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with "CQLParser"; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+## end license ##
+
+from array import array
+
+from .cqlparser import DEFAULTPROFILE, CQL_QUERY, SCOPED_CLAUSE, SEARCH_CLAUSE, SEARCH_TERM, INDEX, RELATION, MODIFIERLIST, MODIFIER, BOOLEAN, COMPARITOR, TERM, IDENTIFIER
+
+NODES = [CQL_QUERY, SCOPED_CLAUSE, SEARCH_CLAUSE, SEARCH_TERM, INDEX, RELATION, MODIFIERLIST, MODIFIER, BOOLEAN, COMPARITOR, TERM, IDENTIFIER]
+KINDS = dict((aClass, kind) for kind, aClass in enumerate(NODES))
+# nodes of these kinds and higher have a string as their only child
+FIRST_TERMINAL = KINDS[BOOLEAN]
+_CQL_QUERY, _SCOPED_CLAUSE, _SEARCH_CLAUSE, _SEARCH_TERM, _INDEX, _RELATION, _MODIFIERLIST, _MODIFIER, _BOOLEAN, _COMPARITOR, _TERM = range(11)
+
+
+class CompactCql(object):
+    """
+    A parse tree in a few arrays. Node i is a NODES[kinds[i]], a terminal with the
+    string strings[starts[i]] or a node with the children links[starts[i]:starts[i] + counts[i]].
+    Children come before their parent, the last node is the root.
+    """
+    __slots__ = ['kinds', 'starts', 'counts', 'links', 'strings']
+
+    def __init__(self, kinds, starts, counts, links, strings):
+        self.kinds = kinds
+        self.starts = starts
+        self.counts = counts
+        self.links = links
+        self.strings = strings
+
+    @classmethod
+    def fromString(cls, cqlString, profile=None):
+        return (profile or DEFAULTPROFILE).parse(cqlString, builder=CompactCqlBuilder())
+
+    @classmethod
+    def fromTree(cls, root):
+        nodes = []
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            nodes.append(node)
+            if node.__class__ in KINDS and KINDS[node.__class__] < FIRST_TERMINAL:
+                stack.extend(node.children)
+        builder = CompactCqlBuilder()
+        indexes = {}
+        for node in reversed(nodes):
+            kind = KINDS[node.__class__]
+            if kind >= FIRST_TERMINAL:
+                indexes[id(node)] = builder._terminal(kind, node.children[0])
+            else:
+                indexes[id(node)] = builder._node(kind, *[indexes[id(child)] for child in node.children])
+        return builder._result()
+
+    @property
+    def root(self):
+        return len(self.kinds) - 1
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def kind(self, index):
+        return NODES[self.kinds[index]]
+
+    def children(self, index):
+        start = self.starts[index]
+        return self.links[start:start + self.counts[index]]
+
+    def value(self, index):
+        return self.strings[self.starts[index]]
+
+    def asTree(self):
+        """
+        Builds the whole parse tree, one node for every entry. CqlVisitors and the
+        other functions that take a parse tree use this for a CompactCql; only
+        cql2string writes one from the arrays directly.
+        """
+        kinds, starts, counts, links, strings = self.kinds, self.starts, self.counts, self.links, self.strings
+        nodes = []
+        for i, kind in enumerate(kinds):
+            start = starts[i]
+            if kind >= FIRST_TERMINAL:
+                nodes.append(NODES[kind](strings[start]))
+            else:
+                nodes.append(NODES[kind](*[nodes[child] for child in links[start:start + counts[i]]]))
+        return nodes[-1]
+
+    def __repr__(self):
+        return '%s(%s)' % (self.__class__.__name__, repr(self.asTree()))
+
+
+class CompactCqlBuilder(object):
+    """Builder for the parser that creates a CompactCql; use one for each parse."""
+    def __init__(self):
+        self._kinds = array('B')
+        self._starts = array('i')
+        self._counts = array('B')
+        self._links = array('i')
+        self._strings = []
+        self._stringIndexes = {}
+
+    def searchClause(self, index, relation, modifiers, term):
+        term = self._node(_SEARCH_TERM, self._terminal(_TERM, term))
+        if index is None:
+            return self._node(_SEARCH_CLAUSE, term)
+        index = self._node(_INDEX, self._terminal(_TERM, index))
+        comparitor = self._terminal(_COMPARITOR, relation)
+        if modifiers:
+            modifierList = self._node(_MODIFIERLIST, *[
+                self._node(_MODIFIER, self._terminal(_TERM, name), self._terminal(_COMPARITOR, modifierComparitor), self._terminal(_TERM, value))
+                for name, modifierComparitor, value in modifiers])
+            relation = self._node(_RELATION, comparitor, modifierList)
+        else:
+            relation = self._node(_RELATION, comparitor)
+        return self._node(_SEARCH_CLAUSE, index, relation, term)
+
+    def boolean(self, lhs, operator, rhs):
+        if operator == 'or':
+            return self._node(_SCOPED_CLAUSE, lhs, self._terminal(_BOOLEAN, operator), self._scoped(rhs))
+        return self._node(_SCOPED_CLAUSE, self._scoped(lhs), self._terminal(_BOOLEAN, operator), rhs)
+
+    def group(self, inner):
+        return self._node(_SEARCH_CLAUSE, self._node(_CQL_QUERY, self._scoped(inner)))
+
+    def query(self, inner):
+        self._node(_CQL_QUERY, self._scoped(inner))
+        return self._result()
+
+    def _scoped(self, clause):
+        return clause if self._kinds[clause] == _SCOPED_CLAUSE else self._node(_SCOPED_CLAUSE, clause)
+
+    def _node(self, kind, *children):
+        self._kinds.append(kind)
+        self._starts.append(len(self._links))
+        self._counts.append(len(children))
+        self._links.extend(children)
+        return len(self._kinds) - 1
+
+    def _terminal(self, kind, value):
+        index = self._stringIndexes.get(value)
+        if index is None:
+            index = self._stringIndexes[value] = len(self._strings)
+            self._strings.append(value)
+        self._kinds.append(kind)
+        self._starts.append(index)
+        self._counts.append(0)
+        return len(self._kinds) - 1
+
+    def _result(self):
+        return CompactCql(self._kinds, self._starts, self._counts, self._links, self._strings)
@@ -28,6 +28,8 @@
 ## end license ##
 
 from .cqlvisitor import CqlVisitor
+from .cqlparser import CLAUSES, CQL_QUERY, SCOPED_CLAUSE, SEARCH_CLAUSE, SEARCH_TERM, INDEX, RELATION, MODIFIERLIST, MODIFIER, BOOLEAN, COMPARITOR, TERM
+from .compactcql import CompactCql, NODES
 
 from re import compile
 quottableTermChars = compile(r'[\"\(\)\>\=\<\/\s]')
@@ -64,8 +66,222 @@ class Cql2StringVisitor(CqlVisitor):
     visitINDEX = _joinChildren
     visitMODIFIERLIST = _joinChildren
     
-def cql2string(ast):
-    return Cql2StringVisitor(ast).visit()[1:-1]
+def cql2string(ast, canonical=False, sortOperands=False):
+    """
+    Writes the same text as Cql2StringVisitor in one iterative pass over the tree,
+    every fragment once, so long queries take linear time.
+
+    With canonical=True booleans are written in lowercase, every relation and
+    every named comparitor of a modifier has a space on both sides and empty
+    terms are quoted, so the text parses back to the same tree and is fit as a key
+    for caching. With sortOperands=True, which implies canonical, the operands
+    of nested 'and' and 'or' clauses are also flattened and sorted, so queries
+    that differ only in their order or grouping get the same text.
+
+    A CompactCql is written from its arrays; only sortOperands=True converts it
+    to a parse tree first.
+    """
+    if isinstance(ast, CompactCql) and not sortOperands:
+        parts = []
+        root = ast.root
+        if NODES[ast.kinds[root]] is CQL_QUERY:
+            _writeCompact(ast, _joined(ast.children(root), ' '), parts, canonical)
+            return ''.join(parts)
+        _writeCompact(ast, [root], parts, canonical)
+        return ''.join(parts)[1:-1]
+    asTree = getattr(ast, 'asTree', None)
+    if asTree is not None:
+        ast = asTree()
+    if sortOperands and ast.__class__ in _SORTABLE:
+        return _sortedCanonical(ast)
+    canonical = canonical or sortOperands
+    parts = []
+    if ast.__class__ is CQL_QUERY:
+        _write(_joined(ast.children, ' '), parts, canonical)
+        return ''.join(parts)
+    _write([ast], parts, canonical)
+    return ''.join(parts)[1:-1]
+
+# opening text, separator and closing text around the children of a node
+_SURROUNDINGS = {
+    CQL_QUERY: ('(', ' ', ')'),
+    SCOPED_CLAUSE: ('', ' ', ''),
+    SEARCH_CLAUSE: ('', '', ''),
+    SEARCH_TERM: ('', ' ', ''),
+    INDEX: ('', ' ', ''),
+    MODIFIERLIST: ('', ' ', ''),
+    MODIFIER: ('/', '', ''),
+}
+# in canonical text named comparitors in modifiers get spaces, so they do not run into the name and value
+_NAMED_MODIFIER = ('/', ' ', '')
+_SYMBOLS = {'=', '>', '<', '>=', '<=', '<>', '=='}
+_SORTABLE = {CQL_QUERY, SCOPED_CLAUSE, SEARCH_CLAUSE}
+_COMMUTATIVE = {'and', 'or'}
+
+def _write(items, parts, canonical=False):
+    """
+    Writes nodes and strings, the first item first. Clauses, which can nest
+    arbitrarily deep, go through a stack; every other node is written by _text.
+    """
+    stack = list(reversed(items))
+    pop, push, append = stack.pop, stack.append, parts.append
+    while stack:
+        item = pop()
+        nodeClass = item.__class__
+        if nodeClass is str:
+            append(item)
+        elif nodeClass is SEARCH_CLAUSE and item.children[0].__class__ not in CLAUSES:
+            for child in item.children:
+                append(_text(child, canonical))
+        elif nodeClass is SCOPED_CLAUSE and len(item.children) == 3:
+            lhs, boolean, rhs = item.children
+            push(rhs)
+            push(' %s ' % _text(boolean, canonical))
+            push(lhs)
+        elif nodeClass in CLAUSES:
+            opening, separator, closing = _SURROUNDINGS[nodeClass]
+            children = item.children
+            if closing:
+                push(closing)
+            if len(children) == 1:
+                push(children[0])
+            else:
+                stack.extend(reversed(_joined(children, separator)))
+            if opening:
+                push(opening)
+        else:
+            append(_text(item, canonical))
+
+def _text(node, canonical):
+    """The text of a node that is not a clause; those do not nest deeply."""
+    nodeClass = node.__class__
+    if nodeClass is TERM:
+        term = quotTerm(node.children[0])
+        return '""' if canonical and not term else term
+    if nodeClass is COMPARITOR:
+        return node.children[0]
+    if nodeClass is BOOLEAN:
+        return node.children[0].lower() if canonical else node.children[0].upper()
+    if nodeClass is RELATION:
+        relation = ''.join([_text(child, canonical) for child in node.children])
+        return relation if relation == '=' and not canonical else ' %s ' % relation
+    if nodeClass in CLAUSES:
+        parts = []
+        _write([node], parts, canonical)
+        return ''.join(parts)
+    if nodeClass in _SURROUNDINGS:
+        children = node.children
+        if len(children) == 1 and nodeClass is not MODIFIER:
+            return _text(children[0], canonical)
+        if canonical and nodeClass is MODIFIER and len(children) == 3 and children[1].children[0] not in _SYMBOLS:
+            opening, separator, closing = _NAMED_MODIFIER
+        else:
+            opening, separator, closing = _SURROUNDINGS[nodeClass]
+        return opening + separator.join([_text(child, canonical) for child in children]) + closing
+    return node.accept(Cql2StringVisitor(node))
+
+def _writeCompact(compact, items, parts, canonical=False):
+    """Same as _write, for nodes of compact given by their index."""
+    kinds, starts, strings = compact.kinds, compact.starts, compact.strings
+    stack = list(reversed(items))
+    while stack:
+        item = stack.pop()
+        if item.__class__ is str:
+            parts.append(item)
+            continue
+        nodeClass = NODES[kinds[item]]
+        if nodeClass is TERM:
+            term = quotTerm(strings[starts[item]])
+            parts.append('""' if canonical and not term else term)
+        elif nodeClass is COMPARITOR:
+            parts.append(strings[starts[item]])
+        elif nodeClass is BOOLEAN:
+            operator = strings[starts[item]]
+            parts.append(operator.lower() if canonical else operator.upper())
+        elif nodeClass is RELATION:
+            relation = []
+            _writeCompact(compact, compact.children(item), relation, canonical)
+            relation = ''.join(relation)
+            parts.append(relation if relation == '=' and not canonical else ' %s ' % relation)
+        elif nodeClass in _SURROUNDINGS:
+            children = compact.children(item)
+            if canonical and nodeClass is MODIFIER and len(children) == 3 and strings[starts[children[1]]] not in _SYMBOLS:
+                opening, separator, closing = _NAMED_MODIFIER
+            else:
+                opening, separator, closing = _SURROUNDINGS[nodeClass]
+            stack.append(closing)
+            stack.extend(reversed(_joined(children, separator)))
+            stack.append(opening)
+        else:
+            _write([nodeClass(strings[starts[item]])], parts, canonical)
+
+def _sortedCanonical(root):
+    """
+    Canonical text with the operands of 'and' and 'or' sorted, bottom up with an
+    explicit stack. Operands that are boolean clauses themselves get parentheses.
+    """
+    root = _unwrapped(root)
+    texts = {}
+    pending = {}
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if id(node) in pending:
+            operator, operands = pending.pop(id(node))
+            operands = [texts[id(operand)] for operand in operands]
+            if operator in _COMMUTATIVE:
+                operands.sort()
+            texts[id(node)] = '(%s)' % (' %s ' % operator).join(operands)
+            continue
+        operator = _operator(node)
+        if operator is None:
+            parts = []
+            _write([node], parts, canonical=True)
+            texts[id(node)] = ''.join(parts)
+            continue
+        operands = _operands(node, operator) if operator in _COMMUTATIVE else [_unwrapped(node.children[0]), _unwrapped(node.children[2])]
+        pending[id(node)] = operator, operands
+        stack.append(node)
+        stack.extend(operands)
+    text = texts[id(root)]
+    return text[1:-1] if _operator(root) else text
+
+def _unwrapped(clause):
+    """The clause without scoped clauses of one child and parentheses around it."""
+    while True:
+        if clause.__class__ is CQL_QUERY or clause.__class__ is SCOPED_CLAUSE and len(clause.children) == 1:
+            clause = clause.children[0]
+        elif clause.__class__ is SEARCH_CLAUSE and clause.children[0].__class__ is CQL_QUERY:
+            clause = clause.children[0]
+        else:
+            return clause
+
+def _operator(clause):
+    if clause.__class__ is SCOPED_CLAUSE and len(clause.children) == 3:
+        return clause.children[1].children[0].lower()
+    return None
+
+def _operands(clause, operator):
+    """The operands of clause and of the clauses with the same operator below it."""
+    operands = []
+    stack = [clause]
+    while stack:
+        node = _unwrapped(stack.pop())
+        if _operator(node) == operator:
+            stack.append(node.children[2])
+            stack.append(node.children[0])
+        else:
+            operands.append(node)
+    return operands
+
+def _joined(children, separator):
+    if len(children) == 1 or not separator:
+        return list(children)
+    result = [children[0]]
+    for child in children[1:]:
+        result.append(separator)
+        result.append(child)
+    return result
 
 def quotTerm(term):
     if not term:
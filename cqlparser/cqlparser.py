@@ -28,16 +28,15 @@
 #
 ## end license ##
 
-from ._cqlexception import UnsupportedCQL, CQLParseException
-from .cqltokenizer import tokenize
+import re
+from sys import maxsize, intern
+from hashlib import blake2b
 
-DEFAULTCOMPARITORS = ['=', '>', '<', '>=', '<=', '<>', '==', 'any', 'all', 'adj', 'within', 'encloses', 'exact']
-
-class RollBack(Exception):
-    pass
+from ._cqlexception import CQLException, UnsupportedCQL, CQLParseException, CQLLengthLimitException, CQLNestingLimitException, CQLSearchClauseLimitException
+from .cqltokenizer import tokenizeSpans, spanSplitter, charString1, DEFAULTCOMPARITORS, LPAREN, RPAREN, COMPARATOR, SLASH, QUOTED, BOOLEAN_CANDIDATE, WORD
 
 class CQLAbstractSyntaxNode(object):
-    __slots__ = ['children']
+    __slots__ = ['children', '_hash']
 
     def __init__(self, *args):
         self.children = args
@@ -60,13 +59,54 @@ class CQLAbstractSyntaxNode(object):
         return '\n'.join(result)
 
     def __eq__(self, other):
-        return self.__class__ == other.__class__ and self.children == other.children
+        if hasattr(self, '_hash') and hasattr(other, '_hash') and self._hash != other._hash:
+            return False
+        stack = [(self, other)]
+        while stack:
+            node, other = stack.pop()
+            if node is other:
+                continue
+            if node.__class__ != other.__class__ or len(node.children) != len(other.children):
+                return False
+            for child, otherChild in zip(node.children, other.children):
+                if isinstance(child, CQLAbstractSyntaxNode):
+                    stack.append((child, otherChild))
+                elif child != otherChild:
+                    return False
+        return True
 
     def __ne__(self, other):
         return not self.__eq__(other)
 
     def __hash__(self):
-        return hash(self.__class__) ^ hash(self.children)
+        """Nodes are not to be changed once created, every node remembers its hash."""
+        try:
+            return self._hash
+        except AttributeError:
+            pass
+        nodes = []
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if not hasattr(node, '_hash'):
+                nodes.append(node)
+                stack.extend(child for child in node.children if isinstance(child, CQLAbstractSyntaxNode))
+        for node in reversed(nodes):
+            node._hash = hash((node.__class__, tuple(child._hash if isinstance(child, CQLAbstractSyntaxNode) else child for child in node.children)))
+        return self._hash
+
+    def fingerprint(self):
+        """Returns a hexadecimal 128 bit blake2b digest of the tree, the same in every process."""
+        parts = []
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, CQLAbstractSyntaxNode):
+                parts.append('%s/%d' % (node.__class__.__name__, len(node.children)))
+                stack.extend(reversed(node.children))
+            else:
+                parts.append(repr(node))
+        return blake2b('\n'.join(parts).encode('utf-8'), digest_size=16).hexdigest()
 
     def visitChildren(self, visitor):
         return [child.accept(visitor) for child in self.children]
@@ -79,222 +119,388 @@ for aClass in ['SCOPED_CLAUSE', 'BOOLEAN', 'SEARCH_CLAUSE', 'SEARCH_TERM', 'INDE
             return visitor.visit%s(self)
 """ % (aClass, aClass, aClass))
 
-def findLastScopedClause(aNode):
-    if len(aNode.children) == 1 and type(aNode) == SCOPED_CLAUSE:
-        return aNode
-    return findLastScopedClause(aNode.children[-1])
-
-def parseString(cqlString, **kwargs):
-    parser = CQLParser(tokenize(cqlString), **kwargs)
-    return parser.parse()
-
-class Token:
-    def __init__(self, parser, token, caseSensitive = True):
-        self._parser = parser
-        self._token = token
-        self._caseSensitive = caseSensitive
-
-    def __call__(self):
-        #TODO refactor
-        nextToken = self._parser._tokens[self._parser._top]
-        self._parser._top += 1
-        if not nextToken:
-            return False
+# clauses can nest arbitrarily deep, the other nodes cannot
+CLAUSES = frozenset([SCOPED_CLAUSE, SEARCH_CLAUSE, CQL_QUERY])
 
-        if not self._caseSensitive:
-            return nextToken.lower() == self._token.lower() and self._token.lower()
-        if nextToken == self._token:
-            return self._token
-        return False
+def findLastScopedClause(aNode):
+    while not (len(aNode.children) == 1 and type(aNode) == SCOPED_CLAUSE):
+        aNode = aNode.children[-1]
+    return aNode
+
+def parseString(cqlString, builder=None, **kwargs):
+    profile = ParserProfile(**kwargs) if kwargs else DEFAULTPROFILE
+    return profile.parse(cqlString, builder=builder)
+
+def validate(cqlString, profile=None):
+    """
+    Checks cqlString like parseString does, without building a parse tree.
+    Returns None for a valid query, otherwise the CQLException parseString raises.
+    """
+    profile = DEFAULTPROFILE if profile is None else profile
+    if profile._isValid(cqlString):
+        return None
+    try:
+        profile.parse(cqlString, builder=NOBUILDER)
+    except CQLException as e:
+        return e
+
+# booleans are recognized by their first character, see cqltokenizer.booleanCandidate
+BOOLEANS = {'a': 'and', 'A': 'and', 'o': 'or', 'O': 'or', 'n': 'not', 'N': 'not', 'p': 'prox'}
 
 class WildCard:
     def __contains__(self, item):
         return True
 
-class CQLParser:
-    def __init__(self, tokens, supportedModifierNames=WildCard(),
-        supportedComparitors = DEFAULTCOMPARITORS):
-        self._tokens = tokens
-        self._top = 0
-        for term in ['_prefix', '_uri', '_modifierValue']:
-            setattr(self, term, self._term)
-            #(hoewel hier eigenlijk nog een veralgemeniseerde wrap laag omheen zou kunnen)
-        self._supportedComparitors = supportedComparitors
-        self._supportedModifierNames = supportedModifierNames
+class _Either(object):
+    def __init__(self, *containers):
+        self._containers = containers
 
-    def parse(self):
-        if not self._tokens:
-            raise CQLParseException('No tokens found, at least one token expected.')
-        try:
-            result = self._cqlQuery()
-        except (RollBack, IndexError):
-            result = False
-        if not self._top >= len(self._tokens):
-            raise CQLParseException('Unexpected token after parsing ([%s], %s).' % (self._tokens[self._top], str(result)))
-        return result
-
-    def _construct(self, constructor, *termFunctions):
-        bookmark = self._top
-        try:
-            return constructor(*[termFunction() for termFunction in termFunctions])
-        except (RollBack, IndexError):
-            self._top = bookmark
-            raise
-
-    def _term(self):
-        token = self._tokens[self._top]
-        self._top += 1
-        if token[0] == '"':
-            token = token[1:-1].replace(r'\"', '"')
-        elif token[0] in '()=></':
-            raise RollBack
-        return TERM(token)
-
-    def _searchTerm(self):
-        return SEARCH_TERM(self._term())
-
-    def _index(self):
-        """index ::= term"""
-        return INDEX(self._term())
-
-    def _token(self, aToken, caseSensitive = True):
-        return Token(self, aToken, caseSensitive)
-
-    def _cqlQuery(self):
-        """cqlQuery ::= prefixAssignment cqlQuery | scopedClause"""
-        if self._top < len(self._tokens) and self._tokens[self._top] == ">":
-            return \
-                self._construct(CQL_QUERY,
-                    self._prefixAssignment,
-                    self._cqlQuery)
-        return \
-            self._construct(CQL_QUERY,
-                self._scopedClause)
-
-    def _prefixAssignment(self):
-        """prefixAssignment ::= '>' prefix '=' uri | '>' uri"""
-        return \
-            self._construct(UnsupportedCQL("prefixAssignment (>)"),
-                self._token('>'),
-                self._prefix,
-                self._token('='),
-                self._uri) or \
-            self._construct(UnsupportedCQL("prefixAssignment (>)"),
-                self._token('>'),
-                self._uri)
-
-    def _scopedClause(self, insertBefore=None):
-        """
-        scopedClause ::= scopedClause booleanGroup searchClause | searchClause
-        we use:
-        scopedClause ::= searchClause booleanGroup scopedClause | searchClause
-        """
-        searchClause = self._searchClause()
-        bookmark = self._top
-        if insertBefore:
-            scopedClause = SCOPED_CLAUSE(insertBefore[0], insertBefore[1], searchClause)
+    def __contains__(self, item):
+        return any(item in container for container in self._containers)
+
+def _frozen(values):
+    """Lists, tuples and sets as a frozenset, any other container as given."""
+    return frozenset(values) if isinstance(values, (list, tuple, set, frozenset)) else values
+
+class ParserProfile(object):
+    """
+    Parser configuration, prepared once for any number of parses. A profile keeps
+    no state between parses, so it can be shared between threads.
+
+    The optional limits on the length of a query, the number of tokens, the nesting
+    of parentheses and the number of search clauses raise a CQLLimitException as
+    soon as they are exceeded.
+    """
+    def __init__(self, supportedModifierNames=None, supportedComparitors=DEFAULTCOMPARITORS,
+            maxLength=None, maxTokens=None, maxDepth=None, maxSearchClauses=None):
+        self.supportedComparitors = _frozen(supportedComparitors)
+        self.supportedModifierNames = None if supportedModifierNames is None or isinstance(supportedModifierNames, WildCard) else _frozen(supportedModifierNames)
+        self.maxLength = maxLength
+        self.maxTokens = maxTokens
+        self.maxDepth = maxDepth
+        self.maxSearchClauses = maxSearchClauses
+        if isinstance(self.supportedComparitors, frozenset):
+            self._comparitors = self.supportedComparitors.union(DEFAULTCOMPARITORS)
         else:
-            scopedClause = SCOPED_CLAUSE(searchClause)
-        try:
-            boolGroup = self._booleanGroup()
-            if boolGroup.children[0] == 'or':
-                if insertBefore:
-                    searchClause = SEARCH_CLAUSE(CQL_QUERY(scopedClause))
-                scopedClause = SCOPED_CLAUSE(searchClause, boolGroup, self._scopedClause())
-            else:
-                scopedClause = self._scopedClause((scopedClause, boolGroup))
-        except (RollBack, IndexError, StopIteration):
-            self._top = bookmark
-        return scopedClause
-
-    def _boolean(self):
-        """boolean ::= 'and' | 'or' | 'not' | 'prox'"""
-        token = self._tokens[self._top]
-        if token.lower() in ['and', 'or', 'not']:
-            self._top += 1
-            return BOOLEAN(token.lower())
-        if token == 'prox':
-            raise UnsupportedCQL("booleanGroup: 'prox'")
-        raise RollBack
-
-    def _booleanGroup(self):
+            self._comparitors = _Either(self.supportedComparitors, DEFAULTCOMPARITORS)
+        self._validator = None
+
+    def parse(self, text, builder=None):
         """
+        Predictive parser: every production is chosen by looking at the next token,
+        'index relation searchTerm' is recognized by looking one token further.
+
+        cqlQuery ::= prefixAssignment cqlQuery | scopedClause
+        scopedClause ::= scopedClause booleanGroup searchClause | searchClause
+        searchClause ::= '(' cqlQuery ')' | index relation searchTerm | searchTerm
         booleanGroup ::= boolean [ modifierList ]
-        we use:
-        booleanGroup ::= boolean modifierList | boolean
-        """
-        head = self._boolean()
-        try:
-            self._modifierList()
-            raise UnsupportedCQL("modifierLists on booleanGroups not supported")
-        except (RollBack, IndexError):
-            pass
-        return head
+        boolean ::= 'and' | 'or' | 'not' | 'prox'
 
-    def _searchClause(self):
+        'and' and 'not' bind stronger than 'or'. The scopedClauses of 'and' and 'not'
+        nest to the left, those of 'or' nest to the right. Nested cqlQueries are kept
+        on an explicit stack, so very long or deep queries need no recursion.
+        The builder creates the result from the productions as they are recognized,
+        a parse tree if no builder is given; see CqlBuilder for the methods of a builder.
+        """
+        if builder is None:
+            builder = CQLBUILDER
+        if self.maxLength is not None and len(text) > self.maxLength:
+            raise CQLLengthLimitException('Query exceeds the maximum length of %d characters.' % self.maxLength, offset=self.maxLength, limit=self.maxLength)
+        tokens = tokenizeSpans(text, maxTokens=self.maxTokens)
+        end = len(tokens)
+        if not end:
+            raise CQLParseException('No tokens found, at least one token expected.', offset=0)
+        comparitors = self._comparitors
+        maxDepth = maxsize if self.maxDepth is None else self.maxDepth
+        searchClausesLeft = maxsize if self.maxSearchClauses is None else self.maxSearchClauses
+        newSearchClause = builder.searchClause
+        newBoolean = builder.boolean
+        newGroup = builder.group
+        top = 0
+        stack = []
+        orClauses, scopedClause, boolGroup = [], None, None
+        if tokens[0] == COMPARATOR:
+            _prefixAssignment(text, tokens, 0)
+        while True:
+            if top < end and tokens[top] == LPAREN:
+                if len(stack) == maxDepth:
+                    raise CQLNestingLimitException('Query exceeds the maximum nesting depth of %d at offset %d.' % (maxDepth, tokens[top + 1]), offset=tokens[top + 1], limit=maxDepth)
+                top += 3
+                stack.append((orClauses, scopedClause, boolGroup))
+                orClauses, scopedClause, boolGroup = [], None, None
+                if top < end and tokens[top] == COMPARATOR:
+                    _prefixAssignment(text, tokens, top)
+                continue
+            if not searchClausesLeft and top < end:
+                raise CQLSearchClauseLimitException('Query exceeds the maximum of %d search clauses at offset %d.' % (self.maxSearchClauses, tokens[top + 1]), offset=tokens[top + 1], limit=self.maxSearchClauses)
+            searchClausesLeft -= 1
+            if top + 3 < end and (tokens[top + 3] == COMPARATOR or tokens[top + 3] == WORD) and text[tokens[top + 4]:tokens[top + 5]] in comparitors:
+                index = _term(text, tokens, top)
+                relation, modifiers, top = self._relation(text, tokens, top + 3)
+                searchClause = newSearchClause(index, relation, modifiers, _term(text, tokens, top))
+            else:
+                searchClause = newSearchClause(None, None, None, _term(text, tokens, top))
+            top += 3
+            while True:
+                chained = boolGroup is not None
+                scopedClause = newBoolean(scopedClause, boolGroup, searchClause) if chained else searchClause
+                if top < end and tokens[top] == BOOLEAN_CANDIDATE:
+                    boolGroup = BOOLEANS[text[tokens[top + 1]]]
+                    if boolGroup == 'prox':
+                        raise UnsupportedCQL("booleanGroup: 'prox'", offset=tokens[top + 1])
+                    top += 3
+                    if top < end and tokens[top] == SLASH:
+                        self._modifier(text, tokens, top)
+                        raise UnsupportedCQL("modifierLists on booleanGroups not supported", offset=tokens[top + 1])
+                    if boolGroup == 'or':
+                        orClauses.append(newGroup(scopedClause) if chained else searchClause)
+                        boolGroup = None
+                    break
+                for orClause in reversed(orClauses):
+                    scopedClause = newBoolean(orClause, 'or', scopedClause)
+                if not stack:
+                    if top < end:
+                        _unexpected(text, tokens, top)
+                    return builder.query(scopedClause)
+                if top >= end or tokens[top] != RPAREN:
+                    _unexpected(text, tokens, top)
+                top += 3
+                searchClause = newGroup(scopedClause)
+                orClauses, scopedClause, boolGroup = stack.pop()
+
+    def _isValid(self, text):
         """
-        searchClause ::=
-            '(' cqlQuery ')' |
-            index relation searchTerm |
-            searchTerm
+        Recognizes most valid queries with a single regular expression. Queries it
+        does not recognize are not necessarily invalid, the parser decides those.
+        The expression lists the supported comparitors and modifier names, so it
+        is only made for those given as a list, tuple or set.
         """
-        if self._tokens[self._top] == "(":
-            self._top += 1
-            result = SEARCH_CLAUSE(self._cqlQuery())
-            token = self._tokens[self._top] if self._top < len(self._tokens) else None
-            self._top += 1
-            if token != ')':
-                raise RollBack
-            return result
-        try:
-            return self._construct(SEARCH_CLAUSE, self._index, self._relation, self._searchTerm)
-        except (RollBack, IndexError):
-            return SEARCH_CLAUSE(self._searchTerm())
+        if not isinstance(self.supportedComparitors, frozenset) or not isinstance(self.supportedModifierNames, (frozenset, type(None))):
+            return False
+        if self.maxTokens is not None or self.maxDepth is not None or self.maxSearchClauses is not None:
+            return False
+        if self.maxLength is not None and len(text) > self.maxLength:
+            return False
+        if self._validator is None:
+            self._validator = _validator(self)
+        return self._validator.match(text) is not None and _balanced(text)
 
-    def _relation(self):
+    def _relation(self, text, tokens, top):
         """
         relation ::= comparitor [modifierList]
-        we use:
-        relation ::= comparitor modifierList | comparitor
+        modifierList ::=  modifierList modifier | modifier
+        we only support one modifier
         """
-        comparitor = self._comparitor()
-        if self._tokens[self._top] == '/':
-            return RELATION(comparitor, self._modifierList())
-        return RELATION(comparitor)
-
-    def _modifierName(self):
-        modifierName = self._tokens[self._top]
-        self._top += 1
-        if modifierName in self._supportedModifierNames:
-            return TERM(modifierName)
-        raise UnsupportedCQL("Unsupported ModifierName: %s" % modifierName)
-
-    def _comparitor(self):
+        comparitor = self._comparitor(text, tokens, top)
+        top += 3
+        if top < len(tokens) and tokens[top] == SLASH:
+            return comparitor, [self._modifier(text, tokens, top)], top + 12
+        return comparitor, None, top
+
+    def _comparitor(self, text, tokens, top):
         """
         comparitor ::= comparitorSymbol | namedComparitor
         comparitorSymbol ::= '=' | '>' | '<' | '>=' | '<=' | '<>'
         we use a shortcut since most of this is not supported
         """
-        token = self._tokens[self._top]
-        self._top += 1
-        if token in self._supportedComparitors:
-            return COMPARITOR(token)
+        if top >= len(tokens):
+            _unexpected(text, tokens, top)
+        token = text[tokens[top + 1]:tokens[top + 2]]
+        if token in self.supportedComparitors:
+            return token
         if not token in DEFAULTCOMPARITORS:
-            raise RollBack
-        else:
-            raise UnsupportedCQL('Unsupported comparitor: %s' % token)
+            _unexpected(text, tokens, top)
+        raise UnsupportedCQL('Unsupported comparitor: %s' % token, offset=tokens[top + 1])
 
-    def _modifierList(self):
-        """
-        modifierList ::=  modifierList modifier | modifier
-        """
-        return MODIFIERLIST(self._modifier())
-
-    def _modifier(self):
+    def _modifier(self, text, tokens, top):
         """
         modifier ::= '/' modifierName [comparitorSymbol modifierValue]
         """
-        if self._tokens[self._top] != '/':
-            raise RollBack
-        self._top += 1
-        return self._construct(MODIFIER, self._modifierName, self._comparitor, self._modifierValue)
+        top += 3
+        if top >= len(tokens):
+            _unexpected(text, tokens, top)
+        modifierName = text[tokens[top + 1]:tokens[top + 2]]
+        if self.supportedModifierNames is not None and modifierName not in self.supportedModifierNames:
+            raise UnsupportedCQL("Unsupported ModifierName: %s" % modifierName, offset=tokens[top + 1])
+        return modifierName, self._comparitor(text, tokens, top + 3), _term(text, tokens, top + 6)
+
+def _term(text, tokens, top):
+    """term ::= identifier | 'and' | 'or' | 'not' | 'prox' | ..."""
+    kind = tokens[top] if top < len(tokens) else None
+    if kind == WORD or kind == BOOLEAN_CANDIDATE:
+        return text[tokens[top + 1]:tokens[top + 2]]
+    if kind != QUOTED:
+        _unexpected(text, tokens, top)
+    return text[tokens[top + 1] + 1:tokens[top + 2] - 1].replace(r'\"', '"')
+
+def _prefixAssignment(text, tokens, top):
+    """prefixAssignment ::= '>' prefix '=' uri | '>' uri"""
+    if text[tokens[top + 1]:tokens[top + 2]] == '>':
+        _term(text, tokens, top + 3)
+        raise UnsupportedCQL("prefixAssignment (>)", offset=tokens[top + 1])
+
+def _unexpected(text, tokens, top):
+    if top >= len(tokens):
+        raise CQLParseException('Unexpected end of query at offset %d.' % len(text), offset=len(text))
+    offset = tokens[top + 1]
+    raise CQLParseException('Unexpected token %s at offset %d.' % (repr(text[offset:tokens[top + 2]]), offset), offset=offset)
+
+class CqlBuilder(object):
+    """
+    Builds the parse tree of CQL_QUERY, SCOPED_CLAUSE, SEARCH_CLAUSE, ... nodes.
+
+    Other builders create any other result in the same pass, they implement:
+    searchClause(index, relation, modifiers, term): index and relation are None for
+        a term only, modifiers is None or a list of (name, comparitor, value).
+    boolean(lhs, operator, rhs): operator is 'and', 'or' or 'not'.
+    group(inner): a parenthesized query, or an 'and' chain that is an operand of 'or'.
+    query(inner): the result of the parse.
+    The parser keeps no state in a builder, a builder that does so is used for one parse.
+    """
+    def searchClause(self, index, relation, modifiers, term):
+        if index is None:
+            return SEARCH_CLAUSE(SEARCH_TERM(TERM(term)))
+        return SEARCH_CLAUSE(INDEX(TERM(index)), _relation(relation, modifiers), SEARCH_TERM(TERM(term)))
+
+    def boolean(self, lhs, operator, rhs):
+        if operator == 'or':
+            return SCOPED_CLAUSE(lhs, BOOLEAN(operator), _scoped(rhs))
+        return SCOPED_CLAUSE(_scoped(lhs), BOOLEAN(operator), rhs)
+
+    def group(self, inner):
+        return SEARCH_CLAUSE(CQL_QUERY(_scoped(inner)))
+
+    def query(self, inner):
+        return CQL_QUERY(_scoped(inner))
+
+def _relation(comparitor, modifiers):
+    if modifiers:
+        return RELATION(COMPARITOR(comparitor), MODIFIERLIST(*(MODIFIER(TERM(name), COMPARITOR(modifierComparitor), TERM(value)) for name, modifierComparitor, value in modifiers)))
+    return RELATION(COMPARITOR(comparitor))
+
+def _scoped(clause):
+    return clause if clause.__class__ is SCOPED_CLAUSE else SCOPED_CLAUSE(clause)
+
+class InterningCqlBuilder(CqlBuilder):
+    """
+    Builds parse trees that share their INDEX, RELATION, SEARCH_TERM and BOOLEAN nodes
+    with the earlier trees of the same builder, to keep the parse trees in caches small.
+    Clauses are never shared, visitors may keep results per clause. At most size nodes
+    of a kind are kept; a table that is full starts over.
+    """
+    def __init__(self, size=10000):
+        self._size = size
+        self._indexes = {}
+        self._relations = {}
+        self._searchTerms = {}
+        self._booleans = {}
+
+    def searchClause(self, index, relation, modifiers, term):
+        searchTerm = self._searchTerms.get(term)
+        if searchTerm is None:
+            searchTerm = self._share(self._searchTerms, term, SEARCH_TERM(TERM(term)))
+        if index is None:
+            return SEARCH_CLAUSE(searchTerm)
+        indexNode = self._indexes.get(index)
+        if indexNode is None:
+            index = intern(index)
+            indexNode = self._share(self._indexes, index, INDEX(TERM(index)))
+        key = (relation, tuple(modifiers)) if modifiers else relation
+        relationNode = self._relations.get(key)
+        if relationNode is None:
+            relationNode = self._share(self._relations, key, _relation(relation, modifiers))
+        return SEARCH_CLAUSE(indexNode, relationNode, searchTerm)
+
+    def boolean(self, lhs, operator, rhs):
+        booleanNode = self._booleans.get(operator)
+        if booleanNode is None:
+            booleanNode = self._share(self._booleans, operator, BOOLEAN(operator))
+        if operator == 'or':
+            return SCOPED_CLAUSE(lhs, booleanNode, _scoped(rhs))
+        return SCOPED_CLAUSE(_scoped(lhs), booleanNode, rhs)
+
+    def _share(self, table, key, node):
+        if len(table) >= self._size:
+            table.clear()
+        table[key] = node
+        return node
+
+class _NoBuilder(object):
+    def searchClause(self, index, relation, modifiers, term):
+        pass
+
+    def boolean(self, lhs, operator, rhs):
+        pass
+
+    def group(self, inner):
+        pass
+
+    def query(self, inner):
+        pass
+
+# The validator checks the tokens and the grammar, except for the nesting of
+# parentheses, in one match. Every token pattern matches exactly what the tokenizer
+# would match, so backtracking cannot split tokens. Tokens containing parentheses
+# are left to the parser, so the parentheses in a matching query are its groups.
+wordEnd = r'(?![^"()>=<\s/])'
+quotedString = r'"[^"()]*(?:(?<=\\)"[^"()]*)*(?<!\\)"'
+symbols = {'>=': '>=', '<>': '<>', '<=': '<=', '==': '==', '>': '>(?!=)', '<': '<(?![>=])', '=': '=(?!=)'}
+
+def _validator(profile):
+    term = r'\s*(?:%s|%s%s)' % (quotedString, charString1, wordEnd)
+    comparitor = r'\s*' + _anyOf(_tokenPattern(c, (COMPARATOR, WORD)) for c in profile.supportedComparitors)
+    modifierKinds = (COMPARATOR, SLASH, QUOTED, BOOLEAN_CANDIDATE, WORD)
+    if profile.supportedModifierNames is None:
+        modifierName = r'\s*' + _anyOf([quotedString, charString1 + wordEnd, '/'] + list(symbols.values()))
+    else:
+        modifierName = r'\s*' + _anyOf(_tokenPattern(name, modifierKinds) for name in profile.supportedModifierNames)
+    modifierComparitor = r'\s*' + _anyOf(_tokenPattern(c, modifierKinds) for c in profile.supportedComparitors)
+    searchClause = r'%s(?:%s(?:\s*/%s%s%s)?%s)?' % (term, comparitor, modifierName, modifierComparitor, term, term)
+    scopedClause = r'(?:\s*\()*%s(?:\s*\))*' % searchClause
+    boolean = r'\s*(?i:and|or|not)' + wordEnd
+    return re.compile(r'%s(?:%s%s)*\s*\Z' % (scopedClause, boolean, scopedClause))
+
+def _tokenPattern(text, kinds):
+    token = spanSplitter.fullmatch(text)
+    if token is None or token.start(token.lastindex) != 0 or token.lastindex not in kinds or '(' in text or ')' in text:
+        return None
+    if token.lastindex == COMPARATOR:
+        return symbols[text]
+    if token.lastindex in (WORD, BOOLEAN_CANDIDATE):
+        return re.escape(text) + wordEnd
+    return re.escape(text)
+
+def _anyOf(patterns):
+    patterns = sorted(set(pattern for pattern in patterns if pattern))
+    return '(?:%s)' % '|'.join(patterns) if patterns else '(?!)'
+
+def _balanced(text):
+    depth = 0
+    opening = text.find('(')
+    closing = text.find(')')
+    while closing != -1:
+        if opening != -1 and opening < closing:
+            depth += 1
+            opening = text.find('(', opening + 1)
+        elif depth:
+            depth -= 1
+            closing = text.find(')', closing + 1)
+        else:
+            return False
+    return depth == 0 and opening == -1
+
+CQLBUILDER = CqlBuilder()
+NOBUILDER = _NoBuilder()
+DEFAULTPROFILE = ParserProfile()
+
+class CQLParser:
+    """Parses text, or the list of tokens tokenize() returns for it."""
+    def __init__(self, text, supportedModifierNames=None, supportedComparitors=DEFAULTCOMPARITORS, builder=None,
+            maxLength=None, maxTokens=None, maxDepth=None, maxSearchClauses=None):
+        self._text = text if isinstance(text, str) else ' '.join(text)
+        self._profile = ParserProfile(supportedModifierNames=supportedModifierNames, supportedComparitors=supportedComparitors,
+            maxLength=maxLength, maxTokens=maxTokens, maxDepth=maxDepth, maxSearchClauses=maxSearchClauses)
+        self._builder = builder
+
+    def parse(self):
+        return self._profile.parse(self._text, builder=self._builder)
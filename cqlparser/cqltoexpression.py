@@ -26,37 +26,100 @@
 #
 ## end license ##
 
-from .cqlvisitor import CqlVisitor
-from .cqlparser import parseString as parseCql
+from .cqlvisitor import CqlVisitor, CqlWalker
+from .cqlparser import DEFAULTPROFILE
 from ._queryexpression import QueryExpression
 
 def cqlToExpression(cql):
     if isinstance(cql, QueryExpression):
         return cql
-    if not hasattr(cql, 'accept'):
-        cql = parseCql(cql)
+    if not hasattr(cql, 'accept') and not hasattr(cql, 'asTree'):
+        return DEFAULTPROFILE.parse(cql, builder=ExpressionBuilder())
     return CqlToExpressionVisitor(cql).visit()
 
-class CqlToExpressionVisitor(CqlVisitor):
-    def visitCQL_QUERY(self, node):
-        return CqlVisitor.visitCQL_QUERY(self, node)[0]
+class ExpressionBuilder(object):
+    """
+    Builds QueryExpressions directly from the parser, without a parse tree.
+    It keeps track of the expressions it builds, so use one for each parse.
+    """
+    def __init__(self):
+        self._reversed = set()
+        self._built = set()
+        self._boosts = []
 
-    def visitSCOPED_CLAUSE(self, node):
-        clause = CqlVisitor.visitSCOPED_CLAUSE(self, node)
-        if len(clause) == 1:
-            return clause[0]
-        lhs, operator, rhs = clause
+    def searchClause(self, index, relation, modifiers, term):
+        if index is None:
+            return QueryExpression.searchterm(term=term)
+        result = QueryExpression.searchterm(index=index, relation=relation, term=term)
+        if modifiers:
+            # boosts are converted once the query is complete, like a visitor would
+            self._boosts.append((result, modifiers[0][2]))
+        return result
+
+    def boolean(self, lhs, operator, rhs):
+        operator = operator.upper()
         if operator == 'NOT':
             operator = 'AND'
             rhs.must_not = True
+        if rhs.operator == operator and not rhs.must_not:
+            # 'or' nests to the right; the operands of rhs are kept in reverse
+            # order until it is finished, so lhs can be appended instead of inserted.
+            if id(rhs) not in self._reversed:
+                rhs.operands.reverse()
+                self._reversed.add(id(rhs))
+            lhs = self._finish(lhs)
+            if lhs.operator == operator and not lhs.must_not:
+                rhs.operands.extend(reversed(lhs.operands))
+                self._built.discard(id(lhs))
+            else:
+                rhs.operands.append(lhs)
+            return rhs
+        lhs, rhs = self._finish(lhs), self._finish(rhs)
+        if lhs.operator == operator and not lhs.must_not and id(lhs) in self._built:
+            # 'and' nests to the left; rhs is appended to lhs, which was built
+            # here and is used nowhere else, instead of copying its operands.
+            lhs.operands.append(rhs)
+            return lhs
         result = QueryExpression.nested(operator)
         for hs in [lhs, rhs]:
             if hs.operator == operator and not hs.must_not:
                 result.operands.extend(hs.operands)
             else:
                 result.operands.append(hs)
+        self._built.add(id(result))
         return result
 
+    def group(self, inner):
+        return self._finish(inner)
+
+    def query(self, inner):
+        for expression, boost in self._boosts:
+            expression.relation_boost = float(boost)
+        return self._finish(inner)
+
+    def _finish(self, expression):
+        if id(expression) in self._reversed:
+            self._reversed.remove(id(expression))
+            expression.operands.reverse()
+        return expression
+
+class CqlToExpressionVisitor(CqlWalker):
+    def __init__(self, root):
+        CqlWalker.__init__(self, root)
+        self._builder = ExpressionBuilder()
+
+    def finish(self, result):
+        return self._builder.query(result)
+
+    def visitCQL_QUERY(self, node):
+        return self._builder.group(CqlVisitor.visitCQL_QUERY(self, node)[0])
+
+    def visitSCOPED_CLAUSE(self, node):
+        clause = CqlVisitor.visitSCOPED_CLAUSE(self, node)
+        if len(clause) == 1:
+            return clause[0]
+        return self._builder.boolean(*clause)
+
     def visitSEARCH_CLAUSE(self, node):
         firstChild = node.children[0].name
         results = CqlVisitor.visitSEARCH_CLAUSE(self, node)
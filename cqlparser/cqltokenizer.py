@@ -28,8 +28,10 @@
 ## end license ##
 
 import re
+from array import array
+from itertools import islice
 
-from ._cqlexception import CQLTokenizerException
+from ._cqlexception import CQLTokenizerException, CQLTokenLimitException
 
 #
 # This tokenization is based on the CQL specification at http://loc.gov/cql
@@ -38,19 +40,115 @@ from ._cqlexception import CQLTokenizerException
 charString1 = r'[^"()>=<\s/]+'
 # charString2 is every token surrounded by quotes "", except \"
 charString2 = r'".*?(?:(?<!\\)")'
+# booleans are charString1 tokens that could be a boolean, depending on their position
+booleanCandidate = r'(?:(?i:and|or|not)|prox)(?![^"()>=<\s/])'
 # tokens are charString1, charString2 or ( ) >= <> <= == > < = /
 tokens = [ r'\(', r'\)', '>=', '<>', '<=', '==', '>', '<', r'\=', r'\/', charString2, charString1 ]
+# for tokenizeSpans each kind of token has its own group, the kind of a token is the index of its group
+tokenKinds = [ r'\(', r'\)', '>=|<>|<=|==|>|<|\=', r'\/', charString2, booleanCandidate, charString1 ]
+LPAREN, RPAREN, COMPARATOR, SLASH, QUOTED, BOOLEAN_CANDIDATE, WORD = range(1, len(tokenKinds) + 1)
+TERMS = frozenset([WORD, BOOLEAN_CANDIDATE, QUOTED])
+booleanWord = re.compile(r'(?i:and|or|not)$|prox$')
+
+DEFAULTCOMPARITORS = ['=', '>', '<', '>=', '<=', '<>', '==', 'any', 'all', 'adj', 'within', 'encloses', 'exact']
 
 tokenSplitter = re.compile(r'(?s)\s*(%s)' % (r'|'.join(tokens)))
+spanSplitter = re.compile(r'(?s)\s*(?:%s)' % (r'|'.join('(%s)' % kind for kind in tokenKinds)))
+whitespace = re.compile(r'\s*')
+unquotable = re.compile(r'%s$' % charString1)
 
 def tokenize(text):
-    tokens = tokenSplitter.findall(text)
-    if len(_withoutWhitespace(text)) != len(_withoutWhitespace(''.join(tokens))):
-        raise CQLTokenizerException("Unrecognized token in '%s'" % text.replace("'", r"\'"))
+    tokens = []
+    append = tokens.append
+    end = 0
+    for token in spanSplitter.finditer(text):
+        if token.start() != end:
+            break
+        append(token.group(token.lastindex))
+        end = token.end()
+    if end < len(text):
+        _checkRemainder(text, end)
     return tokens
 
+def tokenizeSpans(text, maxTokens=None):
+    """Returns an array of (kind, start, end) triples, one for each token in text."""
+    spans = []
+    extend = spans.extend
+    end = 0
+    matches = spanSplitter.finditer(text)
+    if maxTokens is not None:
+        matches = islice(matches, maxTokens + 1)
+    for token in matches:
+        if token.start() != end:
+            break
+        kind = token.lastindex
+        end = token.end()
+        extend((kind, token.start(kind), end))
+    if maxTokens is not None and len(spans) > 3 * maxTokens:
+        raise CQLTokenLimitException("Query exceeds the maximum of %d tokens at offset %d." % (maxTokens, spans[-2]), offset=spans[-2], limit=maxTokens)
+    if end < len(text):
+        _checkRemainder(text, end)
+    return array('i', spans)
 
-whitespace = re.compile(r"\s+")
-def _withoutWhitespace(s):
-    return whitespace.sub('', s)
+def canonicalKey(text, supportedComparitors=DEFAULTCOMPARITORS, maxTokens=None):
+    """
+    Returns the tokens of text separated by single spaces, with booleans in
+    lowercase and quotes removed from terms that do not need them. Queries with
+    the same canonicalKey have the same parse tree, provided they are parsed
+    with the same supportedComparitors. maxTokens limits the tokens as
+    tokenizeSpans does.
+    """
+    spans = tokenizeSpans(text, maxTokens=maxTokens)
+    end = len(spans)
+    isComparitorWord = lambda token: token in supportedComparitors or token in DEFAULTCOMPARITORS
+    def isComparitor(top):
+        return top < end and (spans[top] == COMPARATOR or spans[top] == WORD) and isComparitorWord(text[spans[top + 1]:spans[top + 2]])
+    def term(top):
+        token = text[spans[top + 1]:spans[top + 2]]
+        if spans[top] == QUOTED:
+            unquoted = token[1:-1]
+            if unquotable.match(unquoted) and not booleanWord.match(unquoted) and not isComparitorWord(unquoted):
+                return unquoted
+        return token
+    result = []
+    append = result.append
+    top = 0
+    expectClause = True
+    while top < end:
+        kind = spans[top]
+        if expectClause and kind == LPAREN:
+            append('(')
+            top += 3
+        elif expectClause and kind in TERMS:
+            if isComparitor(top + 3):
+                append(term(top))
+                append(text[spans[top + 4]:spans[top + 5]])
+                top += 6
+                if top + 9 < end and spans[top] == SLASH and isComparitor(top + 6) and spans[top + 9] in TERMS:
+                    append('/')
+                    append(text[spans[top + 4]:spans[top + 5]])
+                    append(text[spans[top + 7]:spans[top + 8]])
+                    append(term(top + 9))
+                    top += 12
+                if top >= end or spans[top] not in TERMS:
+                    break
+            append(term(top))
+            top += 3
+            expectClause = False
+        elif not expectClause and kind == RPAREN:
+            append(')')
+            top += 3
+        elif not expectClause and kind == BOOLEAN_CANDIDATE and (top + 3 >= end or spans[top + 3] != SLASH):
+            append(text[spans[top + 1]:spans[top + 2]].lower())
+            top += 3
+            expectClause = True
+        else:
+            break
+    result.extend(text[spans[top + 1]:spans[top + 2]] for top in range(top, end, 3))
+    return ' '.join(result)
 
+def _checkRemainder(text, end):
+    offset = whitespace.match(text, end).end()
+    if offset < len(text):
+        character = text[offset]
+        raise CQLTokenizerException("Unrecognized token %s at offset %d in '%s'" % (repr(character), offset, text.replace("'", r"\'")), offset=offset, character=character)
@@ -22,31 +22,81 @@
 #
 ## end license ##
 
+from .cqlparser import CLAUSES, CQL_QUERY, SCOPED_CLAUSE, SEARCH_CLAUSE, SEARCH_TERM, INDEX, RELATION, MODIFIERLIST, MODIFIER, BOOLEAN, COMPARITOR, TERM, IDENTIFIER
+
+NODES = [CQL_QUERY, SCOPED_CLAUSE, SEARCH_CLAUSE, SEARCH_TERM, INDEX, RELATION, MODIFIERLIST, MODIFIER, BOOLEAN, COMPARITOR, TERM, IDENTIFIER]
+_WALKING = {}
+
 class CqlVisitor(object):
+    """
+    Visits a parse tree in pre-order: a visit method decides whether and when the
+    children of its node are visited. The visit methods of CqlVisitor that visit
+    all children do so with an explicit stack, so deep trees need no recursion
+    as long as a subclass does not override the visit methods of clauses.
+    A CompactCql is converted to a parse tree in full before it is visited.
+    """
+    _equivalents = {}
+
     def __init__(self, root):
-        self._root = root
+        asTree = getattr(root, 'asTree', None)
+        self._root = root if asTree is None else asTree()
 
     def visit(self):
         return self._root.accept(self)
 
-    def visitCQL_QUERY(self, node):
-        return node.visitChildren(self)
+    @classmethod
+    def _dispatchTable(cls):
+        """Visit method for each node class, resolved once for every subclass."""
+        table = cls.__dict__.get('_table')
+        if table is None:
+            table = {}
+            for nodeClass in NODES:
+                method = getattr(cls, 'visit' + nodeClass.name, None)
+                table[nodeClass] = _accept if method is None else cls._equivalents.get(method, method)
+            cls._table = table
+        return table
 
-    def visitSCOPED_CLAUSE(self, node):
-        return node.visitChildren(self)
+    @classmethod
+    def _childrenVisitingClasses(cls):
+        """Node classes that cls visits with _visitChildren, resolved once for every subclass."""
+        classes = cls.__dict__.get('_childrenVisiting')
+        if classes is None:
+            classes = frozenset(nodeClass for nodeClass in NODES if getattr(cls, 'visit' + nodeClass.name, None) is CqlVisitor._visitChildren)
+            cls._childrenVisiting = classes
+        return classes
 
-    def visitSEARCH_CLAUSE(self, node):
-        return node.visitChildren(self)
+    def _visitChildren(self, node):
+        """
+        Same as node.visitChildren(self), but the children of children that are
+        visited with this method too are visited here, in the same order.
+        """
+        if isinstance(self, CqlWalker):
+            return node.visitChildren(self)
+        expand = self._childrenVisitingClasses()
+        results = []
+        stack = [(iter(node.children), results)]
+        while stack:
+            children, childResults = stack[-1]
+            for child in children:
+                if child.__class__ in expand:
+                    grandchildResults = []
+                    childResults.append(grandchildResults)
+                    stack.append((iter(child.children), grandchildResults))
+                    break
+                childResults.append(child.accept(self))
+            else:
+                stack.pop()
+        return results
 
-    def visitRELATION(self, node):
-        return node.visitChildren(self)
+    visitCQL_QUERY = _visitChildren
+    visitSCOPED_CLAUSE = _visitChildren
+    visitSEARCH_CLAUSE = _visitChildren
+    visitRELATION = _visitChildren
+    visitMODIFIER = _visitChildren
 
     def visitMODIFIERLIST(self, node):
         return node.children[0].accept(self)
 
-    def visitMODIFIER(self, node):
-        return node.visitChildren(self)
-
     # TERMINALS
     def visitINDEX(self, node):
         return node.children[0].accept(self)
@@ -62,3 +112,147 @@ class CqlVisitor(object):
 
     def visitTERM(self, node):
         return node.children[0]
+
+
+class CqlWalker(CqlVisitor):
+    """
+    A CqlVisitor that visits every clause after its children, without
+    recursion. node.visitChildren(self) in a visit method returns the
+    results the clauses among the children already have, so a visit method
+    may depend only on its node and those results: it cannot pass state down
+    or skip a subtree. Use CqlVisitor for visitors that do.
+
+    Dispatch goes through a table, made once for every subclass, instead of
+    through node.accept(). Visit methods that are not overridden are replaced
+    with equivalents that get the results of the children directly. That does
+    not make it faster than CqlVisitor; it is 5-15% slower, so use it for
+    trees that are too deep for recursion.
+    """
+    _equivalents = _WALKING
+
+    def visit(self):
+        return self.finish(_walk(self, self._root))
+
+    def finish(self, result):
+        """Returns what visit() returns for the result of the root."""
+        return result
+
+    @classmethod
+    def _inlinedClauses(cls):
+        """Clause classes whose result is the list of the results of their children."""
+        classes = cls.__dict__.get('_inlined')
+        if classes is None:
+            table = cls._dispatchTable()
+            classes = cls._inlined = frozenset(clause for clause in CLAUSES if table[clause] is walkChildren)
+        return classes
+
+
+def walkingEquivalents(visitorClass, **functions):
+    """Registers functions that CqlWalker calls instead of the visit methods of visitorClass."""
+    for name, function in functions.items():
+        _WALKING[visitorClass.__dict__[name]] = function
+
+def walkChildren(walker, node):
+    table = walker.__class__._table
+    return [table[child.__class__](walker, child) for child in node.children]
+
+def walkFirstChild(walker, node):
+    child = node.children[0]
+    return walker.__class__._table[child.__class__](walker, child)
+
+def _accept(visitor, node):
+    return node.accept(visitor)
+
+walkingEquivalents(CqlVisitor,
+    visitCQL_QUERY=walkChildren,
+    visitSCOPED_CLAUSE=walkChildren,
+    visitSEARCH_CLAUSE=walkChildren,
+    visitRELATION=walkChildren,
+    visitMODIFIER=walkChildren,
+    visitMODIFIERLIST=walkFirstChild,
+    visitINDEX=walkFirstChild,
+    visitSEARCH_TERM=walkFirstChild)
+
+
+class _ClauseResults(object):
+    """
+    The results of the clauses among the children of the clause a walker
+    visits. While walking, accept() of those clauses returns them.
+    """
+    NAMES = ['visit' + clause.name for clause in CLAUSES]
+
+    def __init__(self, walker):
+        self.walker = walker
+        self.children = ()
+        self.results = ()
+        self.position = 0
+
+    def set(self, children, results):
+        self.children = children
+        self.results = results
+        self.position = 0
+
+    def result(self, clause):
+        children, position = self.children, self.position
+        if position < len(children) and children[position] is clause:
+            self.position = position + 1
+            return self.results[position]
+        # the same clause object can be a child more than once; its places are taken in turn
+        count = len(children)
+        for i in range(position, position + count):
+            i %= count
+            if children[i] is clause:
+                self.position = i + 1
+                return self.results[i]
+        # not a child, visited as CqlVisitor would
+        return getattr(self.walker.__class__, 'visit' + clause.name)(self.walker, clause)
+
+    def install(self):
+        attributes = self.walker.__dict__
+        self.previous = {name: attributes[name] for name in attributes.keys() & self.NAMES}
+        attributes.update(dict.fromkeys(self.NAMES, self.result))
+
+    def uninstall(self):
+        attributes = self.walker.__dict__
+        for name in self.NAMES:
+            del attributes[name]
+        attributes.update(self.previous)
+
+
+def _walk(walker, root):
+    """
+    The result of walker for root. Every clause is visited after its
+    children, with an explicit stack; a clause that is used in more than one
+    place is visited for every place, as CqlVisitor would.
+    """
+    table = walker._dispatchTable()
+    if root.__class__ not in CLAUSES:
+        return table[root.__class__](walker, root)
+    inlined = walker._inlinedClauses()
+    clauses = _ClauseResults(walker)
+    if inlined != CLAUSES:
+        clauses.install()
+    try:
+        stack = []
+        push, pop = stack.append, stack.pop
+        node, children, results, inline = root, iter(root.children), [], root.__class__ in inlined
+        while True:
+            for child in children:
+                childClass = child.__class__
+                if childClass in CLAUSES:
+                    push((node, children, results, inline))
+                    node, children, results, inline = child, iter(child.children), [], childClass in inlined
+                    break
+                results.append(table[childClass](walker, child) if inline else None)
+            else:
+                if not inline:
+                    clauses.set(node.children, results)
+                    results = table[node.__class__](walker, node)
+                if not stack:
+                    return results
+                node, children, parentResults, inline = pop()
+                parentResults.append(results)
+                results = parentResults
+    finally:
+        if inlined != CLAUSES:
+            clauses.uninstall()
@@ -0,0 +1,83 @@
+## begin license ##
+#
+# "CQLParser" is a parser that builds a parsetree for the given CQL and can convert this into other formats.
+#
+# Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+#
+# This file is part of "CQLParser"
+#
+# "CQLParser" is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# "CQLParser" is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with "CQLParser"; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+## end license ##
+
+from .cql2string import quotTerm
+from .cqltokenizer import booleanWord, DEFAULTCOMPARITORS
+
+
+def expressionToCql(expression):
+    """
+    Writes a QueryExpression as CQL that cqlToExpression turns into an equivalent
+    expression. Operands with must_not are written after 'NOT', so they must be
+    operands of an 'AND' with at least one operand without must_not.
+    """
+    if expression.must_not:
+        raise ValueError('CQL cannot express must_not without an operand to exclude it from')
+    parts = []
+    stack = [expression]
+    while stack:
+        item = stack.pop()
+        if item.__class__ is str:
+            parts.append(item)
+        elif item.operator:
+            stack.extend(reversed(_operandsWithBooleans(item)))
+        else:
+            parts.append(_searchClause(item))
+    return ''.join(parts)
+
+def _operandsWithBooleans(expression):
+    operands = list(expression.operands)
+    if not operands:
+        raise ValueError('Expression %s has no operands' % expression.operator)
+    operator = expression.operator.upper()
+    if any(operand.must_not for operand in operands):
+        positive = next((i for i, operand in enumerate(operands) if not operand.must_not), None)
+        if operator != 'AND' or positive is None:
+            raise ValueError('must_not needs an operand without it in an AND expression')
+        operands.insert(0, operands.pop(positive))
+    result = []
+    for operand in operands:
+        if result:
+            result.append(' NOT ' if operand.must_not else ' %s ' % operator)
+        if operand.operator:
+            result.extend(['(', operand, ')'])
+        else:
+            result.append(operand)
+    return result
+
+def _searchClause(expression):
+    term = _term(expression.term)
+    if expression.index is None:
+        return term
+    relation = expression.relation
+    if expression.relation_boost is not None:
+        relation = '%s/boost=%s' % (relation, expression.relation_boost)
+    return '%s%s%s' % (_term(expression.index), relation if relation == '=' else ' %s ' % relation, term)
+
+def _term(term):
+    if not term:
+        return '""'
+    if booleanWord.match(term) or term in DEFAULTCOMPARITORS:
+        return '"%s"' % term
+    return quotTerm(term)
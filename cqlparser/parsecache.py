@@ -0,0 +1,131 @@
+## begin license ##
+#
+# "CQLParser" is a parser that builds a parsetree for the given CQL and can convert this into other formats.
+#
+# Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+#
+# This file is part of "CQLParser"
+#
+# "CQLParser" is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# "CQLParser" is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with "CQLParser"; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+## end license ##
+
+from collections import OrderedDict
+from threading import Lock
+
+from .cqlparser import parseString as parseCql, ParserProfile, DEFAULTPROFILE, WildCard
+from .cqltokenizer import canonicalKey, DEFAULTCOMPARITORS
+from .cqltoexpression import ExpressionBuilder
+
+
+class ParseCache(object):
+    """Bounded, thread-safe LRU cache for parseString and cqlToExpression, keyed on
+    the query and the parser options.
+
+    Cached parse trees are shared and must be treated as read-only; every
+    cqlToExpression call returns a fresh copy of the cached QueryExpression.
+    With normalize=True queries are cached by their canonicalKey, so queries that
+    only differ in whitespace, case of booleans or needless quotes share a result.
+    Every spelling is kept as another key for it, so the canonicalKey is made
+    once for each spelling, and each of them counts for the size of the cache.
+    newBuilder is called for every parse and returns the builder for it, for
+    example CompactCqlBuilder, or a function returning one InterningCqlBuilder
+    to share it between parses."""
+
+    def __init__(self, size=1000, normalize=False, newBuilder=None):
+        self._size = size
+        self._normalize = normalize
+        self._newBuilder = newBuilder
+        self._cache = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def parseString(self, cqlString, **kwargs):
+        keys, result = self._get('cql', cqlString, kwargs)
+        if result is None:
+            result = parseCql(cqlString, builder=None if self._newBuilder is None else self._newBuilder(), **kwargs)
+            self._put(keys, result)
+        return result
+
+    def cqlToExpression(self, cqlString, **kwargs):
+        keys, result = self._get('expression', cqlString, kwargs)
+        if result is None:
+            profile = ParserProfile(**kwargs) if kwargs else DEFAULTPROFILE
+            result = profile.parse(cqlString, builder=ExpressionBuilder())
+            self._put(keys, result)
+        return result.copy()
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def __len__(self):
+        return len(self._cache)
+
+    def _get(self, kind, cqlString, kwargs):
+        """
+        Returns the keys for cqlString and the cached result, or None. With
+        normalize=True the canonicalKey is only made when cqlString itself is
+        not in the cache; if that finds the result, cqlString is added as
+        another key for it.
+        """
+        options = tuple(sorted((name, _optionKey(value)) for name, value in kwargs.items())) if kwargs else ()
+        key = (kind, cqlString, options)
+        with self._lock:
+            result = self._cache.get(key)
+            if result is not None or not self._normalize:
+                return self._counted([key], result)
+        maxLength = kwargs.get('maxLength')
+        if maxLength is not None and len(cqlString) > maxLength:
+            # the parser rejects it, it must not find a shorter equivalent
+            with self._lock:
+                return self._counted([key], None)
+        canonical = (kind, canonicalKey(cqlString, kwargs.get('supportedComparitors') or DEFAULTCOMPARITORS, maxTokens=kwargs.get('maxTokens')), options)
+        with self._lock:
+            result = self._cache.get(canonical)
+            if result is not None:
+                self._cache.move_to_end(canonical)
+                self._store(key, result)
+            return self._counted([key, canonical], result)
+
+    def _counted(self, keys, result):
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._cache.move_to_end(keys[-1])
+        return keys, result
+
+    def _put(self, keys, value):
+        with self._lock:
+            for key in keys:
+                self._store(key, value)
+
+    def _store(self, key, value):
+        self._cache[key] = value
+        while len(self._cache) > self._size:
+            self._cache.popitem(last=False)
+            self.evictions += 1
+
+def _optionKey(value):
+    if isinstance(value, WildCard):
+        return WildCard
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return frozenset(value) if isinstance(value, set) else tuple(value)
@@ -0,0 +1,271 @@
+## begin license ##
+#
+# "CQLParser" is a parser that builds a parsetree for the given CQL and can convert this into other formats.
+#
+# Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+#
+# This file is part of "CQLParser"
+#
+# "CQLParser" is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# "CQLParser" is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with "CQLParser"; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+## end license ##
+
+from re import compile
+
+from .cqlparser import CLAUSES, SEARCH_TERM, TERM, DEFAULTPROFILE
+from ._queryexpression import QueryExpression
+from .cql2string import cql2string
+from .cqltoexpression import cqlToExpression
+from .expressiontocql import expressionToCql
+
+placeholder = compile(r'\$(\w+)$')
+
+
+def parameterize(cqlOrExpression):
+    """
+    Returns the shape of a parse tree or QueryExpression and the values of its search
+    terms, in query order: 'dc.title=aap AND year>2000' gives the shape of
+    'dc.title=$1 AND year>$2' and ['aap', '2000'].
+    """
+    if isinstance(cqlOrExpression, QueryExpression):
+        return _parameterizeExpression(cqlOrExpression)
+    asTree = getattr(cqlOrExpression, 'asTree', None)
+    return _parameterizeTree(cqlOrExpression if asTree is None else asTree())
+
+
+class QueryShape(object):
+    """
+    A query with placeholders for search terms, as steps to build it bottom up.
+    Shapes are equal when their steps are, so they can be used as keys.
+    """
+    def __init__(self, steps, slotCount, expression=False):
+        self._steps = steps
+        self._slotCount = slotCount
+        self._expression = expression
+        self._template = None
+
+    def __len__(self):
+        return self._slotCount
+
+    def __eq__(self, other):
+        return isinstance(other, QueryShape) and self._steps == other._steps
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash(self._steps)
+
+    @property
+    def template(self):
+        """The query with $1, $2, ... as search terms."""
+        if self._template is None:
+            self._template = self.build(['$%d' % (i + 1) for i in range(self._slotCount)])
+        return self._template
+
+    def __str__(self):
+        if self._expression:
+            return expressionToCql(self.template)
+        return cql2string(self.template)
+
+    def __repr__(self):
+        return '%s(%s)' % (self.__class__.__name__, repr(str(self)))
+
+    def build(self, values):
+        """Returns a new parse tree or QueryExpression with the values for the placeholders, in order."""
+        if len(values) != self._slotCount:
+            raise ValueError('Expected %d values, got %d' % (self._slotCount, len(values)))
+        if self._expression:
+            return _buildExpression(self._steps, values)
+        return _buildTree(self._steps, values)
+
+
+def prepare(template, profile=None):
+    """
+    Parses a template like 'dc.title=$title AND rec.type=$type' once, for binding
+    values to its placeholders later.
+    """
+    return CqlTemplate((profile or DEFAULTPROFILE).parse(template))
+
+
+class CqlTemplate(object):
+    """
+    A parsed query in which search terms like $name are placeholders. Values are
+    bound as complete search terms, as if quoted with quotTerm, so 'a OR b' stays
+    a single term.
+    """
+    def __init__(self, tree):
+        self._tree = tree
+        self._treeSteps, self._treeNames = _bindingSteps(tree)
+        self._expressionShape, terms = parameterize(cqlToExpression(tree))
+        self._expressionSlots = self._slots(terms)
+        self._names = frozenset(self._treeNames)
+        self.names = tuple(sorted(self._names))
+
+    def bind(self, **values):
+        """
+        Returns the parse tree with the values for the placeholders. Only the nodes
+        above placeholders are new, the others are shared with the template.
+        """
+        self._check(values)
+        return _buildTree(self._treeSteps, [str(values[name]) for name in self._treeNames])
+
+    def bindExpression(self, **values):
+        """Returns the QueryExpression with the values for the placeholders."""
+        self._check(values)
+        return self._expressionShape.build([term if name is None else str(values[name]) for name, term in self._expressionSlots])
+
+    def __str__(self):
+        return cql2string(self._tree)
+
+    def __repr__(self):
+        return '%s(%s)' % (self.__class__.__name__, repr(str(self)))
+
+    @staticmethod
+    def _slots(terms):
+        result = []
+        for term in terms:
+            match = placeholder.match(term)
+            result.append((match.group(1), term) if match else (None, term))
+        return result
+
+    def _check(self, values):
+        if values.keys() != self._names:
+            raise ValueError('Expected values for %s, got %s' % (', '.join(self.names), ', '.join(sorted(values))))
+
+
+_SLOT, _CONSTANT = range(2)
+
+def _parameterizeTree(root):
+    """
+    Steps are (node class, child count) for clauses, (_SLOT, index) for search
+    terms and (_CONSTANT, node) for the rest, like INDEX and RELATION, which are
+    shared by all trees built from the shape.
+    """
+    steps = []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if node.__class__ in CLAUSES:
+            steps.append((node.__class__, len(node.children)))
+            stack.extend(node.children)
+        elif node.__class__ is SEARCH_TERM:
+            steps.append((_SLOT, node.children[0].children[0]))
+        else:
+            steps.append((_CONSTANT, node))
+    steps.reverse()
+    values = []
+    for i, (kind, argument) in enumerate(steps):
+        if kind is _SLOT:
+            steps[i] = (_SLOT, len(values))
+            values.append(argument)
+    return QueryShape(tuple(steps), len(values)), values
+
+def _buildTree(steps, values):
+    # nodes get their children directly, without the call to __init__
+    nodes = []
+    append = nodes.append
+    new = object.__new__
+    for kind, argument in steps:
+        if kind is _CONSTANT:
+            append(argument)
+            continue
+        if kind is _SLOT:
+            term = new(TERM)
+            term.children = (values[argument],)
+            node = new(SEARCH_TERM)
+            node.children = (term,)
+        else:
+            node = new(kind)
+            start = len(nodes) - argument
+            node.children = tuple(nodes[start:])
+            del nodes[start:]
+        append(node)
+    return nodes[0]
+
+def _bindingSteps(root):
+    """
+    Steps for _buildTree that build only the search terms with a placeholder and
+    the clauses above them; every other node is a constant taken from root.
+    Returns the steps and the name of the placeholder of each slot.
+    """
+    bound = set()
+    stack = [(root, False)]
+    while stack:
+        node, childrenDone = stack.pop()
+        if node.__class__ in CLAUSES:
+            if not childrenDone:
+                stack.append((node, True))
+                stack.extend((child, False) for child in node.children)
+            elif any(id(child) in bound for child in node.children):
+                bound.add(id(node))
+        elif node.__class__ is SEARCH_TERM and placeholder.match(node.children[0].children[0]):
+            bound.add(id(node))
+    steps = []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if id(node) not in bound:
+            steps.append((_CONSTANT, node))
+        elif node.__class__ is SEARCH_TERM:
+            steps.append((_SLOT, node.children[0].children[0]))
+        else:
+            steps.append((node.__class__, len(node.children)))
+            stack.extend(node.children)
+    steps.reverse()
+    names = []
+    for i, (kind, argument) in enumerate(steps):
+        if kind is _SLOT:
+            steps[i] = (_SLOT, len(names))
+            names.append(placeholder.match(argument).group(1))
+    return tuple(steps), names
+
+def _parameterizeExpression(root):
+    """
+    Steps are the sorted attributes of each expression and its operand count, or
+    None for a search term. The term of a search term is taken out as a value.
+    """
+    steps = []
+    values = []
+    stack = [root]
+    while stack:
+        expression = stack.pop()
+        if expression.operator:
+            steps.append((tuple(sorted(item for item in expression._attributes() if item[0] != 'operands')), len(expression.operands)))
+            stack.extend(expression.operands)
+        else:
+            steps.append((tuple(sorted(item for item in expression._attributes() if item[0] != 'term')), None))
+            values.append(expression.term)
+    steps.reverse()
+    values.reverse()
+    return QueryShape(tuple(steps), len(values), expression=True), values
+
+def _buildExpression(steps, values):
+    expressions = []
+    new = QueryExpression.__new__
+    slot = 0
+    for attributes, operandCount in steps:
+        expression = new(QueryExpression)
+        for name, value in attributes:
+            setattr(expression, name, value)
+        if operandCount is None:
+            expression.term = values[slot]
+            slot += 1
+        else:
+            start = len(expressions) - operandCount
+            expression.operands = expressions[start:]
+            del expressions[start:]
+        expressions.append(expression)
+    return expressions[0]
@@ -0,0 +1,81 @@
+## begin license ##
+#
+# "CQLParser" is a parser that builds a parsetree for the given CQL and can convert this into other formats.
+#
+# Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+#
+# This file is part of "CQLParser"
+#
+# "CQLParser" is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# "CQLParser" is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with "CQLParser"; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+## end license ##
+
+from .cqlparser import CQLAbstractSyntaxNode
+from ._queryexpression import QueryExpression
+
+
+def rewrite(cqlOrExpression, transform, nodeClasses=None):
+    """
+    Returns a parse tree or QueryExpression in which each node is replaced by what
+    transform returns for it. Nodes are given bottom up, after their children are
+    rewritten; transform returns the node itself to keep it and must not change it.
+    Only the nodes from a replaced node up to the root are new, everything else is
+    shared with the original. With nodeClasses, only nodes of these classes are
+    given to transform, for example (INDEX,).
+    """
+    if isinstance(cqlOrExpression, QueryExpression):
+        return _rewriteExpression(cqlOrExpression, transform)
+    if not isinstance(cqlOrExpression, CQLAbstractSyntaxNode) and hasattr(cqlOrExpression, 'asTree'):
+        cqlOrExpression = cqlOrExpression.asTree()
+    return _rewriteTree(cqlOrExpression, transform, nodeClasses)
+
+def _rewriteTree(root, transform, nodeClasses):
+    nodes = []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        nodes.append(node)
+        # children are either nodes or a single string
+        if node.children and isinstance(node.children[0], CQLAbstractSyntaxNode):
+            stack.extend(node.children)
+    replaced = {}
+    for node in reversed(nodes):
+        result = node
+        if replaced and any(id(child) in replaced for child in node.children):
+            result = node.__class__(*[replaced.get(id(child), child) for child in node.children])
+        if nodeClasses is None or node.__class__ in nodeClasses:
+            result = transform(result)
+        if result is not node:
+            replaced[id(node)] = result
+    return replaced.get(id(root), root)
+
+def _rewriteExpression(root, transform):
+    expressions = []
+    stack = [root]
+    while stack:
+        expression = stack.pop()
+        expressions.append(expression)
+        if expression.operator:
+            stack.extend(expression.operands)
+    replaced = {}
+    for expression in reversed(expressions):
+        result = expression
+        if expression.operator and replaced and any(id(operand) in replaced for operand in expression.operands):
+            result = expression._shallowCopy()
+            result.operands = [replaced.get(id(operand), operand) for operand in expression.operands]
+        result = transform(result)
+        if result is not expression:
+            replaced[id(expression)] = result
+    return replaced.get(id(root), root)
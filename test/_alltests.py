@@ -41,8 +41,15 @@ import unittest
 from cqlparsertest import CQLParserTest
 from cqltokenizertest import CQLTokenizerTest
 from cqlidentityvisitortest import CqlIdentityVisitorTest
+from cqlvisitortest import CqlVisitorTest, CqlWalkerTest
 from cqltoexpressiontest import CqlToExpressionTest
+from expressiontocqltest import ExpressionToCqlTest
 from cql2stringtest import Cql2StringTest
+from parsecachetest import ParseCacheTest
+from compactcqltest import CompactCqlTest
+from binarycqltest import BinaryCqlTest
+from rewritetest import RewriteTest
+from queryshapetest import QueryShapeTest, CqlTemplateTest
 from speedtest import SpeedTest
 
 if __name__ == '__main__':
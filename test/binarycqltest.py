@@ -0,0 +1,83 @@
+## begin license ##
+#
+# "CQLParser" is a parser that builds a parsetree for the given CQL and can convert this into other formats.
+#
+# Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+#
+# This file is part of "CQLParser"
+#
+# "CQLParser" is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# "CQLParser" is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with "CQLParser"; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+## end license ##
+from unittest import TestCase
+from pickle import dumps as pickleDumps
+
+from cqlparser import dumps, loads, parseString, cqlToExpression, CompactCql, QueryExpression
+
+
+class BinaryCqlTest(TestCase):
+    def testTree(self):
+        for query in ['a', 'a = b', 'a =/boost=2 b AND (c OR d) OR e NOT f', '((a))', 'title exact "ë \\\\"x\\\\""']:
+            tree = parseString(query)
+            data = dumps(tree)
+            self.assertEqual(bytes, type(data))
+            self.assertEqual(b'CQLB\x01T', data[:6])
+            self.assertEqual(tree, loads(data))
+            self.assertEqual(tree, loads(dumps(CompactCql.fromString(query))))
+
+    def testEqualLeavesAreShared(self):
+        tree = loads(dumps(parseString('a = b AND a = c')))
+        lhs, boolean, rhs = tree.children[0].children
+        self.assertTrue(lhs.children[0].children[0].children[0] is rhs.children[0].children[0])
+        self.assertFalse(lhs.children[0] is rhs)
+
+    def testExpression(self):
+        for query in ['a', 'a = b', 'a =/boost=2 b AND (c OR d) OR e NOT f', 'title exact "ë"']:
+            expression = cqlToExpression(query)
+            data = dumps(expression)
+            self.assertEqual(b'CQLB\x01E', data[:6])
+            self.assertEqual(expression, loads(data))
+        expression = QueryExpression.nested('AND')
+        expression.operands.append(QueryExpression.searchterm(term='a', boost=2.5))
+        expression.operands.append(QueryExpression(term='b', relation_boost=3, index=None))
+        expression.operands.append(QueryExpression.nested('OR'))
+        result = loads(dumps(expression))
+        self.assertEqual(expression, result)
+        self.assertEqual(float, type(result.operands[0].relation_boost))
+        self.assertEqual(int, type(result.operands[1].relation_boost))
+        self.assertFalse(hasattr(result.operands[1], 'relation'))
+        self.assertRaises(TypeError, lambda: dumps(QueryExpression(term=['a'])))
+
+    def testLongQuery(self):
+        query = ' OR '.join('dc.title=word%d' % i for i in range(5000))
+        tree = parseString(query)
+        self.assertEqual(tree, loads(dumps(tree)))
+        expression = cqlToExpression(query)
+        self.assertEqual(expression, loads(dumps(expression)))
+
+    def testBuffers(self):
+        for query in ['a = b AND c', ' OR '.join('dc.title=word%d' % i for i in range(300))]:
+            for data in [dumps(parseString(query)), dumps(cqlToExpression(query))]:
+                self.assertEqual(loads(data), loads(bytearray(data)))
+                self.assertEqual(loads(data), loads(memoryview(data)))
+
+    def testSmallerThanPickle(self):
+        query = ' OR '.join('dc.title=word%d' % i for i in range(100))
+        self.assertTrue(len(dumps(parseString(query))) < len(pickleDumps(parseString(query))) / 5)
+        self.assertTrue(len(dumps(cqlToExpression(query))) < len(pickleDumps(cqlToExpression(query))) * 0.6)
+
+    def testNotSerialized(self):
+        self.assertRaises(ValueError, lambda: loads(b'CQLX\x01T' + bytes(10)))
+        self.assertRaises(ValueError, lambda: loads(dumps(parseString('a')).replace(b'CQLB\x01', b'CQLB\x02')))
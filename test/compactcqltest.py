@@ -0,0 +1,90 @@
+## begin license ##
+#
+# "CQLParser" is a parser that builds a parsetree for the given CQL and can convert this into other formats.
+#
+# Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+#
+# This file is part of "CQLParser"
+#
+# "CQLParser" is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# "CQLParser" is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with "CQLParser"; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+## end license ##
+
+from unittest import TestCase
+
+from cqlparser import CompactCql, CompactCqlBuilder, ParserProfile, parseString, cql2string, cqlToExpression, CqlIdentityVisitor, CqlVisitor, UnsupportedCQL
+from cqlparser.cqlparser import SEARCH_CLAUSE, SEARCH_TERM, TERM, COMPARITOR
+
+
+class CompactCqlTest(TestCase):
+    def testFromString(self):
+        for query in ['a', 'a = b', 'a =/boost=2 b AND (c OR d) OR e NOT f', '((a))', 'a OR b AND c OR d']:
+            compact = CompactCql.fromString(query)
+            self.assertEqual(parseString(query), compact.asTree())
+            self.assertEqual(parseString(query), CompactCql.fromTree(parseString(query)).asTree())
+
+    def testArrays(self):
+        compact = CompactCql.fromString('a = b OR a = c')
+        self.assertEqual(['b', 'a', '=', 'c', 'or'], compact.strings)
+        root = compact.root
+        self.assertEqual('CQL_QUERY', compact.kind(root).name)
+        [scopedClause] = compact.children(root)
+        lhs, boolean, rhs = compact.children(scopedClause)
+        self.assertEqual('or', compact.value(boolean))
+        self.assertEqual(SEARCH_CLAUSE, compact.kind(lhs))
+        index, relation, term = compact.children(lhs)
+        [comparitor] = compact.children(relation)
+        self.assertEqual((COMPARITOR, '='), (compact.kind(comparitor), compact.value(comparitor)))
+        [term] = compact.children(term)
+        self.assertEqual((TERM, 'b'), (compact.kind(term), compact.value(term)))
+        self.assertEqual(len(compact.kinds), len(compact))
+
+    def testBuilder(self):
+        profile = ParserProfile(supportedModifierNames=['boost'])
+        compact = profile.parse('a =/boost=2 b', builder=CompactCqlBuilder())
+        self.assertEqual(parseString('a =/boost=2 b'), compact.asTree())
+        self.assertRaises(UnsupportedCQL, lambda: CompactCql.fromString('a =/other=2 b', profile=profile))
+
+    def testCql2StringWithoutTree(self):
+        class WithoutTree(CompactCql):
+            def asTree(self):
+                raise AssertionError('asTree')
+        for query in ['a', 'title = "a b" AND (c OR d =/boost=2 e) NOT f', 'a exact "" or ((b))', 'x any/boost=1.5 y']:
+            tree = parseString(query)
+            for node in [tree, tree.children[0].children[-1]]:
+                compact = CompactCql.fromTree(node)
+                withoutTree = WithoutTree(compact.kinds, compact.starts, compact.counts, compact.links, compact.strings)
+                self.assertEqual(cql2string(node), cql2string(withoutTree))
+                self.assertEqual(cql2string(node, canonical=True), cql2string(withoutTree, canonical=True))
+
+    def testVisitors(self):
+        query = 'title = "a b" AND (c OR d =/boost=2 e) NOT f'
+        compact = CompactCql.fromString(query)
+        self.assertEqual(cql2string(parseString(query)), cql2string(compact))
+        self.assertEqual(cqlToExpression(query), cqlToExpression(compact))
+        self.assertEqual(parseString('a AND (b OR c = d)'), CqlIdentityVisitor(CompactCql.fromString('a AND (b OR c = d)')).visit())
+        class TermsVisitor(CqlVisitor):
+            def visitTERM(self, node):
+                return [node.children[0]]
+            def visitSEARCH_CLAUSE(self, node):
+                return sum(node.visitChildren(self), [])
+        self.assertEqual([[['title', '=', 'a b']]], TermsVisitor(CompactCql.fromString('title = "a b"')).visit())
+        self.assertEqual(TermsVisitor(parseString(query)).visit(), TermsVisitor(compact).visit())
+
+    def testLongQuery(self):
+        query = ' OR '.join('dc.title=word%d' % (i % 100) for i in range(5000))
+        compact = CompactCql.fromString(query)
+        self.assertEqual(103, len(compact.strings))
+        self.assertEqual(parseString(query), compact.asTree())
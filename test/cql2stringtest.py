@@ -30,7 +30,8 @@
 
 from unittest import TestCase
 
-from cqlparser import parseString, cql2string, quotTerm
+from cqlparser import parseString, cql2string, quotTerm, CompactCql
+from cqlparser.cql2string import Cql2StringVisitor
 
 class Cql2StringTest(TestCase):
     def testTerm(self):
@@ -64,6 +65,46 @@ class Cql2StringTest(TestCase):
     def testBoost(self):
         self.assertCql('field0 =/boost=1.5 value')
 
+    def testLongQuery(self):
+        self.assertCql(' OR '.join('id%d' % i for i in range(2000)))
+        self.assertCql(' AND '.join('id%d' % i for i in range(2000)))
+        self.assertCql('(' * 2000 + 'term' + ')' * 2000)
+
+    def testSameAsVisitor(self):
+        tree = parseString('(a OR "b c") AND title =/boost=1.5 "d=e" NOT f')
+        nodes = [tree]
+        while nodes:
+            node = nodes.pop()
+            self.assertEqual(Cql2StringVisitor(node).visit()[1:-1], cql2string(node))
+            nodes.extend(child for child in node.children if hasattr(child, 'children'))
+        self.assertEqual(cql2string(tree), cql2string(CompactCql.fromTree(tree)))
+
+    def testCanonical(self):
+        self.assertEqual('title = x and (y or "z z")', cql2string(parseString('title=x AND ( y OR "z z")'), canonical=True))
+        self.assertEqual('title exact "" not a', cql2string(parseString('title exact "" NOT "a"'), canonical=True))
+        self.assertEqual('x =/boost=1.5 y', cql2string(parseString('x =/boost=1.5 "y"'), canonical=True))
+        self.assertEqual('(a and b) or c', cql2string(parseString('a AND b OR c'), canonical=True))
+
+    def testCanonicalModifiersParseBack(self):
+        self.assertEqual('a =/boost exact 2 b', cql2string(parseString('a =/boost exact 2 b'), canonical=True))
+        self.assertEqual('a any/x all "y z" b', cql2string(parseString('a any/x all "y z" b'), canonical=True))
+        for query in ['a =/boost exact 2 b', 'a any/x all "y z" b OR c =/boost >= 2 d', 'title=/y any z "x y" AND b', 'a =/boost=1.5 b']:
+            tree = parseString(query)
+            self.assertEqual(tree, parseString(cql2string(tree, canonical=True)))
+            self.assertEqual(tree, parseString(cql2string(CompactCql.fromTree(tree), canonical=True)))
+            self.assertEqual(cql2string(tree, sortOperands=True), cql2string(parseString(cql2string(tree, sortOperands=True)), sortOperands=True))
+
+    def testCanonicalSortOperands(self):
+        canonical = lambda cql: cql2string(parseString(cql), sortOperands=True)
+        self.assertEqual('a and b and c', canonical('c AND (b and a)'))
+        self.assertEqual('a and b and c', canonical('((a AND b)) AND c'))
+        self.assertEqual('(a and b) or c', canonical('c OR b AND a'))
+        self.assertEqual('(a or b) and c', canonical('c AND (b OR a)'))
+        self.assertEqual('(b not a) not c', canonical('b NOT a NOT c'))
+        self.assertEqual('a not (b and c)', canonical('a NOT (c AND b)'))
+        self.assertEqual('title = x', canonical('(((title=x)))'))
+        self.assertEqual(canonical('c AND (b OR a)'), canonical('(a or b) and c'))
+
     def assertCql(self, expected, input=None):
         if input == None:
             input = expected
@@ -30,8 +30,10 @@
 
 import unittest
 
-from cqlparser import parseString, UnsupportedCQL, CQLParseException, CQLTokenizerException
-from cqlparser.cqlparser import CQL_QUERY, SCOPED_CLAUSE, SEARCH_CLAUSE, BOOLEAN, SEARCH_TERM, INDEX, RELATION, COMPARITOR, MODIFIERLIST, MODIFIER, TERM
+from cqlparser import parseString, validate, ParserProfile, CqlBuilder, InterningCqlBuilder, cqlToExpression, cql2string, CQLException, UnsupportedCQL, CQLParseException, CQLTokenizerException
+from cqlparser import CQLLimitException, CQLLengthLimitException, CQLTokenLimitException, CQLNestingLimitException, CQLSearchClauseLimitException
+from cqlparser.cqltokenizer import tokenize
+from cqlparser.cqlparser import CQLParser, findLastScopedClause, CQL_QUERY, SCOPED_CLAUSE, SEARCH_CLAUSE, BOOLEAN, SEARCH_TERM, INDEX, RELATION, COMPARITOR, MODIFIERLIST, MODIFIER, TERM
 
 
 class CQLParserTest(unittest.TestCase):
@@ -162,6 +164,14 @@ class CQLParserTest(unittest.TestCase):
         self.assertException(CQLParseException, 'term AND (')
         self.assertException(CQLTokenizerException, '"=+')
 
+    def testErrorsHaveOffsets(self):
+        self.assertEqual(8, self.assertException(CQLParseException, 'term and').offset)
+        self.assertEqual(9, self.assertException(CQLParseException, 'term and )').offset)
+        self.assertEqual(6, self.assertException(CQLParseException, '(term term2)').offset)
+        self.assertEqual(5, self.assertException(UnsupportedCQL, 'term prox term2').offset)
+        self.assertEqual(7, self.assertException(UnsupportedCQL, 'field1 > 200', supportedComparitors=['=']).offset)
+        self.assertEqual(7, self.assertException(CQLTokenizerException, 'term = "abc').offset)
+
     def testIllegalBooleanGroups(self):
         self.assertException(CQLParseException, 'term notanyof_and_or_not_prox term2')
         self.assertException(UnsupportedCQL, 'term prox term2')
@@ -180,6 +190,10 @@ class CQLParserTest(unittest.TestCase):
         self.assertException(CQLParseException, '(term')
         self.assertException(CQLParseException, '(term term2')
 
+    def testModifierListsOnBooleansAreUnsupported(self):
+        self.assertException(UnsupportedCQL, 'term and/boost=1.0 term2')
+        self.assertException(CQLParseException, 'term and / term2')
+
     def testTermsAreIdentifiers(self):
         self.assertException(CQLParseException, ')')
 
@@ -219,6 +233,132 @@ class CQLParserTest(unittest.TestCase):
         self.assertException(CQLParseException, 'field0 =/boost>10')
         self.assertException(UnsupportedCQL, 'field0 =/not_boost=1.0 value', supportedModifierNames=['aap'])
 
+    def testParserProfile(self):
+        profile = ParserProfile(supportedComparitors=['=', 'exact'], supportedModifierNames=['boost'])
+        self.assertEqual(frozenset(['=', 'exact']), profile.supportedComparitors)
+        for query in ['field0 =/boost=1.5 value', 'a exact b AND (c OR d = e)', 'aap']:
+            self.assertEqual(parseString(query), profile.parse(query))
+            self.assertEqual(profile.parse(query), profile.parse(query))
+        self.assertRaises(UnsupportedCQL, lambda: profile.parse('field1 > 200'))
+        self.assertRaises(UnsupportedCQL, lambda: profile.parse('field0 =/other=1.5 value'))
+        self.assertRaises(UnsupportedCQL, lambda: profile.parse('field0 =/boost>1.5 value'))
+        self.assertRaises(CQLParseException, lambda: profile.parse('field0 =/boost ~ 1.5 value'))
+        self.assertEqual(None, ParserProfile().supportedModifierNames)
+        self.assertEqual(parseString('a = b'), ParserProfile().parse('a = b'))
+
+    def testParserProfileWithOtherContainers(self):
+        class StartsWith(object):
+            def __init__(self, prefix):
+                self.prefix = prefix
+            def __contains__(self, item):
+                return item.startswith(self.prefix)
+        profile = ParserProfile(supportedComparitors=StartsWith('='), supportedModifierNames=StartsWith('bo'))
+        self.assertEqual(parseString('a == b AND c =/boost=2 d'), profile.parse('a == b AND c =/boost=2 d'))
+        self.assertRaises(UnsupportedCQL, lambda: profile.parse('a exact b'))
+        self.assertRaises(UnsupportedCQL, lambda: profile.parse('a =/relevant=2 b'))
+        profile = ParserProfile(supportedComparitors='=any', supportedModifierNames='boost')
+        self.assertEqual('=any', profile.supportedComparitors)
+        self.assertEqual(parseString('a any b OR c =/boost=2 d'), profile.parse('a any b OR c =/boost=2 d'))
+        self.assertEqual(parseString('x = y'), parseString('x = y', supportedComparitors='=any'))
+        self.assertRaises(UnsupportedCQL, lambda: profile.parse('a exact b'))
+        self.assertRaises(UnsupportedCQL, lambda: profile.parse('a =/relevant=2 b'))
+
+    def testLimits(self):
+        e = self.assertException(CQLLengthLimitException, 'a AND b', maxLength=6)
+        self.assertEqual((6, 6), (e.offset, e.limit))
+        self.assertEqual("Query exceeds the maximum length of 6 characters.", str(e))
+        parseString('a AND b', maxLength=7)
+
+        e = self.assertException(CQLTokenLimitException, 'a AND b = c', maxTokens=4)
+        self.assertEqual((10, 4), (e.offset, e.limit))
+        self.assertEqual("Query exceeds the maximum of 4 tokens at offset 10.", str(e))
+        parseString('a AND b = c', maxTokens=5)
+        self.assertException(CQLTokenizerException, 'a AND b = "c', maxTokens=5)
+
+        e = self.assertException(CQLNestingLimitException, 'a AND (b OR (c AND (d)))', maxDepth=2)
+        self.assertEqual((19, 2), (e.offset, e.limit))
+        self.assertEqual("Query exceeds the maximum nesting depth of 2 at offset 19.", str(e))
+        parseString('(a AND (b OR c)) AND (d)', maxDepth=2)
+        self.assertException(CQLNestingLimitException, '(a)', maxDepth=0)
+
+        e = self.assertException(CQLSearchClauseLimitException, 'a AND (b OR c = d) NOT e', maxSearchClauses=2)
+        self.assertEqual((12, 2), (e.offset, e.limit))
+        self.assertEqual("Query exceeds the maximum of 2 search clauses at offset 12.", str(e))
+        parseString('a AND (b OR c = d) NOT e', maxSearchClauses=4)
+        self.assertException(CQLParseException, 'a AND', maxSearchClauses=1)
+
+        profile = ParserProfile(maxLength=100, maxTokens=20, maxDepth=3, maxSearchClauses=5)
+        self.assertEqual(parseString('a AND (b OR c)'), profile.parse('a AND (b OR c)'))
+        for query in ['a' * 101, 'a ' * 21, '((((a))))', 'a or b or c or d or e or f']:
+            self.assertRaises(CQLLimitException, lambda: profile.parse(query))
+
+    def testValidate(self):
+        for query in ['aap', 'a AND b', 'title = "a (b)" OR (c NOT d)', 'x =/boost=2 y', 'and or and', '"a\\"b"', '((a) and (b)) or c']:
+            self.assertEqual(None, validate(query), query)
+        for query in ['', 'a AND', 'a) OR (b', '(a', 'a)', 'a prox b', '> x = y', 'a AND/boost=2 b', 'a "b"', 'field1 > 200 ?"']:
+            try:
+                parseString(query)
+                self.fail(query)
+            except CQLException as e:
+                error = validate(query)
+                self.assertEqual((type(e), str(e), e.offset), (type(error), str(error), error.offset))
+        profile = ParserProfile(supportedComparitors=['='], supportedModifierNames=['boost'], maxDepth=1)
+        self.assertEqual(None, validate('(a = b) OR c =/boost=2 d', profile=profile))
+        self.assertEqual(UnsupportedCQL, type(validate('a > b', profile=profile)))
+        self.assertEqual(UnsupportedCQL, type(validate('a =/other=2 b', profile=profile)))
+        self.assertEqual(CQLNestingLimitException, type(validate('((a))', profile=profile)))
+
+    def testInterningBuilder(self):
+        builder = InterningCqlBuilder(size=3)
+        query = 'dc.title = aap AND (dc.title = noot OR aap) NOT dc.title =/boost=2 aap'
+        first = parseString(query, builder=builder)
+        self.assertEqual(parseString(query), first)
+        second = parseString(query, builder=builder)
+        self.assertEqual(first, second)
+        lhs, boolean, rhs = second.children[0].children
+        self.assertTrue(boolean is first.children[0].children[1])
+        self.assertFalse(rhs is first.children[0].children[2])
+        index, relation, searchTerm = rhs.children
+        self.assertTrue(index is first.children[0].children[2].children[0])
+        self.assertTrue(searchTerm is lhs.children[0].children[0].children[2])
+        self.assertFalse(relation is lhs.children[0].children[0].children[1])
+        self.assertEqual(cqlToExpression(query), cqlToExpression(second))
+        self.assertEqual(cql2string(first), cql2string(second))
+        for i in range(10):
+            parseString('index%d = term%d' % (i, i), builder=builder)
+        self.assertTrue(len(builder._indexes) <= 3)
+
+    def testBuilder(self):
+        class SqlBuilder(object):
+            def searchClause(self, index, relation, modifiers, term):
+                return "%s %s '%s'" % (index or 'text', relation or '=', term) + ''.join(' /* %s%s%s */' % modifier for modifier in modifiers or [])
+            def boolean(self, lhs, operator, rhs):
+                return '%s %s %s' % (lhs, 'AND NOT' if operator == 'not' else operator.upper(), rhs)
+            def group(self, inner):
+                return '(%s)' % inner
+            def query(self, inner):
+                return 'WHERE ' + inner
+        self.assertEqual("WHERE text = 'aap'", parseString('aap', builder=SqlBuilder()))
+        self.assertEqual("WHERE title = 'a b' AND NOT (year > '2000' OR text = 'c')", parseString('title="a b" NOT (year > 2000 OR c)', builder=SqlBuilder()))
+        self.assertEqual("WHERE text = 'a' OR (text = 'b' AND text = 'c') OR text = 'd'", parseString('a or b and c or d', builder=SqlBuilder()))
+        self.assertEqual("WHERE title = 'a' /* boost=2 */", CQLParser('title =/boost=2 a', builder=SqlBuilder()).parse())
+        self.assertEqual("WHERE title = 'a' /* boost=2 */", ParserProfile(supportedModifierNames=['boost']).parse('title =/boost=2 a', builder=SqlBuilder()))
+        self.assertRaises(UnsupportedCQL, lambda: parseString('title =/boost=2 a', supportedModifierNames=[], builder=SqlBuilder()))
+        self.assertEqual(parseString('a or b and c or (d)'), parseString('a or b and c or (d)', builder=CqlBuilder()))
+
+    def testCQLParserOfTokens(self):
+        for query in ['a', 'title = "a b" AND (c OR d =/boost=2 e)', 'a exact ""']:
+            self.assertEqual(parseString(query), CQLParser(tokenize(query)).parse())
+            self.assertEqual(parseString(query), CQLParser(query).parse())
+        self.assertRaises(UnsupportedCQL, lambda: CQLParser(tokenize('a > b'), supportedComparitors=['=']).parse())
+
+    def testCQLParserLimits(self):
+        self.assertEqual(parseString('(a) AND b'), CQLParser('(a) AND b', maxLength=9, maxTokens=5, maxDepth=1, maxSearchClauses=2).parse())
+        self.assertRaises(CQLLengthLimitException, lambda: CQLParser('(a) AND b', maxLength=8).parse())
+        self.assertRaises(CQLTokenLimitException, lambda: CQLParser(tokenize('(a) AND b'), maxTokens=4).parse())
+        self.assertRaises(CQLNestingLimitException, lambda: CQLParser('(a) AND b', maxDepth=0).parse())
+        self.assertRaises(CQLSearchClauseLimitException, lambda: CQLParser('(a) AND b', maxSearchClauses=1).parse())
+
     def testAcceptVisitor(self):
         q = CQL_QUERY(None)
         c = COMPARITOR('=')
@@ -310,14 +450,43 @@ class CQLParserTest(unittest.TestCase):
 
     def testHashing(self):
         self.assertEqual(hash(parseString('term')), hash(parseString('term')))
+        self.assertNotEqual(hash(parseString('term')), hash(parseString('term2')))
+
+    def testHashIsRemembered(self):
+        tree = parseString('a AND (b OR c)')
+        self.assertFalse(hasattr(tree, '_hash'))
+        self.assertEqual(hash(tree), hash(parseString('a AND (b OR c)')))
+        self.assertEqual(hash(tree), tree._hash)
+        self.assertEqual(hash(tree.children[0].children[2]), tree.children[0].children[2]._hash)
+        self.assertEqual({tree: 'value'}, {parseString('a AND (b OR c)'): 'value'})
+        self.assertNotEqual(tree, parseString('a AND (b OR d)'))
+
+    def testFingerprint(self):
+        self.assertEqual('48a6f72c6b720e28c6dc46f340031fc3', parseString('a AND b').fingerprint())
+        self.assertEqual(parseString('a and "b"').fingerprint(), parseString('a AND b').fingerprint())
+        fingerprints = set(parseString(query).fingerprint() for query in ['a AND b', 'a OR b', 'b AND a', 'a=b', 'a =/boost=2 b', '(a AND b)', '"a AND b"'])
+        self.assertEqual(7, len(fingerprints))
+        self.assertEqual(32, len(parseString(' OR '.join('t%d' % i for i in range(5000))).fingerprint()))
+
+    def testLongBooleanChainsNeedNoRecursion(self):
+        for boolean in ['OR', 'AND']:
+            query = (' %s ' % boolean).join('id%d' % i for i in range(5000))
+            result = parseString(query)
+            self.assertEqual(result, parseString(query))
+            self.assertEqual(hash(result), hash(parseString(query)))
+            self.assertNotEqual(result, parseString(query + ' %s id' % boolean))
+        query = '(' * 5000 + 'a' + ')' * 5000
+        self.assertEqual(parseString(query), parseString(query))
+        query = ' OR '.join('id%d' % i for i in range(5000))
+        self.assertEqual(SCOPED_CLAUSE(SEARCH_CLAUSE(SEARCH_TERM(TERM('id4999')))), findLastScopedClause(parseString(query)))
 
     ### Helper methods
     def assertException(self, exceptionClass, queryString, **kwargs):
         try:
             parseString(queryString, **kwargs)
             self.fail()
-        except exceptionClass:
-            pass
+        except exceptionClass as e:
+            return e
 
     def assertEqualsCQL(self, expected, result):
         self.assertEqual(expected, result, "%s !=\n %s" % (expected.prettyPrint(), result.prettyPrint()))
@@ -28,7 +28,7 @@
 
 from unittest import TestCase
 
-from cqlparser import parseString as parseCql, cqlToExpression, QueryExpression
+from cqlparser import parseString as parseCql, cqlToExpression, QueryExpression, CQLParseException
 
 
 class CqlToExpressionTest(TestCase):
@@ -142,6 +142,32 @@ class CqlToExpressionTest(TestCase):
         self.assertFalse(QueryExpression.searchterm('a') == QueryExpression.searchterm('b'))
         self.assertTrue(QueryExpression.searchterm('a') != QueryExpression.searchterm('b'))
 
+    def testEqualsWithAbsentAttributes(self):
+        self.assertEqual(QueryExpression(term='a'), QueryExpression(term='a'))
+        self.assertNotEqual(QueryExpression(term='a'), QueryExpression(term='a', index=None))
+        self.assertNotEqual(QueryExpression(term='a'), QueryExpression.searchterm(term='a'))
+        self.assertEqual(QueryExpression(operator='AND'), QueryExpression(operator='AND'))
+        self.assertNotEqual(QueryExpression(operator='AND'), QueryExpression.nested('AND'))
+        self.assertEqual(hash(QueryExpression(term='a')), hash(QueryExpression(term='a')))
+
+    def testSlots(self):
+        expression = QueryExpression.searchterm(index='field', relation='=', term='value')
+        self.assertFalse(hasattr(expression, '__dict__'))
+        self.assertFalse(hasattr(QueryExpression.nested('AND'), 'index'))
+        self.assertRaises(TypeError, lambda: QueryExpression(term='a', count=3))
+        self.assertEqual({'operator': None, 'relation_boost': None, 'must_not': False, 'index': 'field', 'relation': '=', 'term': 'value'}, expression.asDict())
+
+    def testEqualsDeepExpression(self):
+        def deep():
+            expression = QE('x')
+            for i in range(3000):
+                expression = QueryExpression(operator='AND' if i % 2 else 'OR', operands=[QE('t%d' % i), expression])
+            return expression
+        one, other = deep(), deep()
+        self.assertEqual(one, other)
+        other.operands[1].operands[1].operands[0].term = 'y'
+        self.assertNotEqual(one, other)
+
     def testBoost(self):
         expression = cqlToExpression("title =/boost=2.0 cats")
         self.assertEqual(QE('title=cats', relation_boost=2.0), expression)
@@ -199,6 +225,61 @@ AND
         self.assertEqual("QueryExpression(must_not=False, operands=[QueryExpression(index=None, must_not=False, operator=None, relation=None, relation_boost=None, term='aap'), QueryExpression(must_not=True, operands=[QueryExpression(index=None, must_not=False, operator=None, relation=None, relation_boost=None, term='noot'), QueryExpression(index='title', must_not=False, operator=None, relation='=', relation_boost=None, term='mies')], operator='OR', relation_boost=None)], operator='AND', relation_boost=None)", repr(qe))
         self.assertEqual(qe, eval(repr(qe)))
 
+    def testFromStringEqualsFromParseTree(self):
+        for query in ['aap', 'a=b', 'a =/boost=1.5 b', '(a)', 'a AND b OR c', 'a OR b AND c', 'a OR (b OR c) NOT d',
+                '(a OR b) AND (c OR d) OR e NOT (f AND g)', 'a NOT b NOT c', 'a OR b OR (c AND d AND e) OR f', '((a OR b) OR c) OR d']:
+            self.assertEqual(cqlToExpression(parseCql(query)), cqlToExpression(query), query)
+            self.assertEqual(repr(cqlToExpression(parseCql(query))), repr(cqlToExpression(query)), query)
+        self.assertRaises(ValueError, lambda: cqlToExpression('a =/boost=x b'))
+        self.assertRaises(CQLParseException, lambda: cqlToExpression('a =/boost=x b AND'))
+
+    def testHashAndFingerprint(self):
+        expression = cqlToExpression('a AND b =/boost=2 c NOT (d OR e)')
+        self.assertEqual(hash(expression), hash(cqlToExpression('a AND b =/boost=2 c NOT (d OR e)')))
+        self.assertEqual({expression: 1}, {cqlToExpression('a AND b =/boost=2 c NOT (d OR e)'): 1})
+        self.assertEqual('24ad5344b83c312fee205eebf01b100c', cqlToExpression('a AND b').fingerprint())
+        others = ['a AND b =/boost=3 c NOT (d OR e)', 'a AND b = c NOT (d OR e)', 'a AND b =/boost=2 c AND (d OR e)', 'a AND b =/boost=2 c NOT (d AND e)']
+        for other in others:
+            self.assertNotEqual(hash(expression), hash(cqlToExpression(other)))
+            self.assertNotEqual(expression.fingerprint(), cqlToExpression(other).fingerprint())
+        fingerprint = expression.fingerprint()
+        expression.operands[0].term = 'z'
+        self.assertNotEqual(fingerprint, expression.fingerprint())
+        self.assertNotEqual(hash(cqlToExpression('a AND b =/boost=2 c NOT (d OR e)')), hash(expression))
+
+    def testCopy(self):
+        expression = cqlToExpression('a AND (b OR c) NOT d')
+        copy = expression.copy()
+        self.assertEqual(expression, copy)
+        self.assertFalse(copy is expression)
+        self.assertFalse(copy.operands[1] is expression.operands[1])
+        copy.operands[1].operands.append(QE('e'))
+        copy.operands[2].must_not = False
+        self.assertEqual(cqlToExpression('a AND (b OR c) NOT d'), expression)
+
+    def testLongOrChain(self):
+        expression = cqlToExpression(' OR '.join('id=%d' % i for i in range(10000)))
+        self.assertEqual('OR', expression.operator)
+        self.assertEqual([QE('id=%d' % i) for i in range(10000)], expression.operands)
+        self.assertEqual(10001, len(list(expression.iter())))
+
+    def testLongAndChain(self):
+        query = ' AND '.join('id=%d' % i for i in range(20000)) + ' NOT id=x AND (a AND b)'
+        expected = [QE('id=%d' % i) for i in range(20000)] + [QE('id=x', must_not=True), QE('a'), QE('b')]
+        for cql in [query, parseCql(query)]:
+            expression = cqlToExpression(cql)
+            self.assertEqual('AND', expression.operator)
+            self.assertEqual(expected, expression.operands)
+
+    def testOrChainsWithNestedOrAndNot(self):
+        self.assertEqual(QueryExpression(operator='OR', operands=[QE('a'), QE('b'), QE('c'), QE('d')]), cqlToExpression('a OR (b OR c) OR d'))
+        self.assertEqual(QueryExpression(operator='OR', operands=[QE('a'), QE('b'), QE('c'), QE('d')]), cqlToExpression('(a OR b) OR (c OR d)'))
+        self.assertEqual(QueryExpression(operator='OR', operands=[
+                QE('a'),
+                QueryExpression(operator='AND', operands=[QE('b'), QueryExpression(operator='OR', must_not=True, operands=[QE('c'), QE('d')])]),
+                QE('e'),
+            ]), cqlToExpression('a OR b NOT (c OR d) OR e'))
+
     def testStrWithIndexAndQuotes(self):
         qe = cqlToExpression('field="aap noot"')
         self.assertEqual("QueryExpression(index='field', must_not=False, operator=None, relation='=', relation_boost=None, term='aap noot')", repr(qe))
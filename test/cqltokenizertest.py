@@ -30,7 +30,7 @@
 import unittest
 
 from cqlparser import CQLTokenizerException
-from cqlparser.cqltokenizer import tokenize
+from cqlparser.cqltokenizer import tokenize, tokenSplitter, canonicalKey, tokenizeSpans, LPAREN, RPAREN, COMPARATOR, SLASH, QUOTED, BOOLEAN_CANDIDATE, WORD
 
 
 class CQLTokenizerTest(unittest.TestCase):
@@ -70,6 +70,57 @@ class CQLTokenizerTest(unittest.TestCase):
         except CQLTokenizerException as e:
             pass
 
+    def testUnrecognizedTokenReportsOffset(self):
+        try:
+            tokenize('ab and "cd')
+            self.fail()
+        except CQLTokenizerException as e:
+            self.assertEqual(7, e.offset)
+            self.assertEqual('"', e.character)
+            self.assertTrue("at offset 7" in str(e), str(e))
+        try:
+            tokenize('"=+')
+            self.fail()
+        except CQLTokenizerException as e:
+            self.assertEqual(0, e.offset)
+
+    def testWhitespace(self):
+        self.assertEqual([], tokenize(''))
+        self.assertEqual([], tokenize(' \t\n'))
+        self.assertEqual(['abc', 'def'], tokenize(' abc\n\tdef  '))
+
+    def testTokenSplitter(self):
+        text = '(title =/boost=1.5 "a b") AND anderson or prox'
+        self.assertEqual(tokenize(text), tokenSplitter.findall(text))
+        self.assertEqual(['a', '>=', 'b'], tokenSplitter.findall('a >= b'))
+
+    def testSpans(self):
+        text = '(title =/boost=1.5 "a b") AND anderson or prox'
+        spans = tokenizeSpans(text)
+        self.assertEqual('i', spans.typecode)
+        triples = [tuple(spans[i:i + 3]) for i in range(0, len(spans), 3)]
+        self.assertEqual([LPAREN, WORD, COMPARATOR, SLASH, WORD, COMPARATOR, WORD, QUOTED, RPAREN, BOOLEAN_CANDIDATE, WORD, BOOLEAN_CANDIDATE, BOOLEAN_CANDIDATE], [kind for kind, start, end in triples])
+        self.assertEqual(tokenize(text), [text[start:end] for kind, start, end in triples])
+        self.assertEqual((QUOTED, 19, 24), triples[7])
+
+    def testSpanKindsOfComparators(self):
+        spans = tokenizeSpans('a >= b <> c == d < e')
+        self.assertEqual([WORD, COMPARATOR, WORD, COMPARATOR, WORD, COMPARATOR, WORD, COMPARATOR, WORD], list(spans[::3]))
+        self.assertEqual([BOOLEAN_CANDIDATE, BOOLEAN_CANDIDATE, WORD, WORD], list(tokenizeSpans('Not oR PROX nota')[::3]))
+
+    def testCanonicalKey(self):
+        self.assertEqual('a and b', canonicalKey('a AND b'))
+        self.assertEqual('( a or b ) not "c d"', canonicalKey('  (a   Or "b") not   "c d"'))
+        self.assertEqual('title = aap', canonicalKey('title="aap"'))
+        self.assertEqual('x = / boost = 2 y', canonicalKey('x =/boost="2" "y"'))
+        self.assertEqual('AND = "AND" and "and"', canonicalKey('AND = "AND" AND "and"'))
+        self.assertEqual('a "any" b', canonicalKey('a "any" b'))
+        self.assertEqual('a = "eq"', canonicalKey('a="eq"', supportedComparitors=['=', 'eq']))
+        self.assertEqual('a = eq', canonicalKey('a="eq"'))
+        self.assertEqual('"" "a\\"b" prox', canonicalKey('"" "a\\"b" prox'))
+        self.assertEqual('a AND / b', canonicalKey('a AND / b'))
+        self.assertRaises(CQLTokenizerException, lambda: canonicalKey('"unfinished'))
+
     def testBugReportedByErik(self):
         stack = tokenize('lom.general.title="en" AND (lom.general.title="green" OR lom.general.title="red")')
         self.assertEqual(['lom.general.title', '=', '"en"', 'AND', '(', 'lom.general.title', '=', '"green"', 'OR', 'lom.general.title', '=', '"red"', ')'], stack)
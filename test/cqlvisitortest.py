@@ -0,0 +1,197 @@
+## begin license ##
+#
+# "CQLParser" is a parser that builds a parsetree for the given CQL and can convert this into other formats.
+#
+# Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+#
+# This file is part of "CQLParser"
+#
+# "CQLParser" is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# "CQLParser" is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with "CQLParser"; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+## end license ##
+from unittest import TestCase
+
+from cqlparser import CqlVisitor, CqlWalker, CqlIdentityVisitor, parseString, cql2string, cqlToExpression
+from cqlparser.cqlparser import CQL_QUERY, SCOPED_CLAUSE, BOOLEAN, TERM
+
+
+class CqlVisitorTest(TestCase):
+    def testStateIsPassedDown(self):
+        class DepthVisitor(CqlVisitor):
+            def __init__(self, root):
+                CqlVisitor.__init__(self, root)
+                self.depth = 0
+                self.depths = []
+            def visitCQL_QUERY(self, node):
+                self.depth += 1
+                try:
+                    return CqlVisitor.visitCQL_QUERY(self, node)
+                finally:
+                    self.depth -= 1
+            def visitTERM(self, node):
+                self.depths.append(self.depth)
+                return CqlVisitor.visitTERM(self, node)
+        visitor = DepthVisitor(parseString('a AND (b OR (c))'))
+        visitor.visit()
+        self.assertEqual([1, 2, 3], visitor.depths)
+
+    def testSubtreesCanBeSkipped(self):
+        class SkippingVisitor(CqlVisitor):
+            def __init__(self, root):
+                CqlVisitor.__init__(self, root)
+                self.visited = []
+            def visitSEARCH_CLAUSE(self, node):
+                firstChild = node.children[0]
+                self.visited.append(firstChild.name)
+                if firstChild.name == 'CQL_QUERY':
+                    return None
+                return CqlVisitor.visitSEARCH_CLAUSE(self, node)
+        visitor = SkippingVisitor(parseString('a AND (b OR (c))'))
+        visitor.visit()
+        self.assertEqual(['SEARCH_TERM', 'CQL_QUERY'], visitor.visited)
+
+    def testChildrenCanBeVisitedTwice(self):
+        class TwiceVisitor(CqlVisitor):
+            def __init__(self, root):
+                CqlVisitor.__init__(self, root)
+                self.count = 0
+            def visitSCOPED_CLAUSE(self, node):
+                node.visitChildren(self)
+                return node.visitChildren(self)
+            def visitTERM(self, node):
+                self.count += 1
+                return self.count
+        visitor = TwiceVisitor(parseString('a OR b'))
+        self.assertEqual([[[4], 'OR', [[6]]]], visitor.visit())
+        self.assertEqual(6, visitor.count)
+
+    def testDeepTreesWithDefaultClauses(self):
+        class TermsVisitor(CqlVisitor):
+            def __init__(self, root):
+                CqlVisitor.__init__(self, root)
+                self.terms = []
+            def visitTERM(self, node):
+                self.terms.append(node.children[0])
+                return CqlVisitor.visitTERM(self, node)
+        query = '(' * 2000 + ' OR '.join('a%d' % i for i in range(3000)) + ')' * 2000
+        visitor = TermsVisitor(parseString(query))
+        visitor.visit()
+        self.assertEqual(['a%d' % i for i in range(3000)], visitor.terms)
+
+
+class CqlWalkerTest(TestCase):
+    QUERIES = ['a', 'a = b', 'a =/boost=2 b AND (c OR d) OR e NOT f', '((a))', 'a OR b AND c OR d']
+
+    def testSameResultsAsCqlVisitor(self):
+        class TermsVisitor(CqlVisitor):
+            def visitINDEX(self, node):
+                return node.visitChildren(self)
+            def visitTERM(self, node):
+                return node.children[0].upper()
+        class TermsWalker(CqlWalker, TermsVisitor):
+            pass
+        for query in self.QUERIES:
+            self.assertEqual(CqlVisitor(parseString(query)).visit(), CqlWalker(parseString(query)).visit())
+            self.assertEqual(TermsVisitor(parseString(query)).visit(), TermsWalker(parseString(query)).visit())
+
+    def testOverridesAreCalledInOrder(self):
+        class CollectingVisitor(CqlVisitor):
+            def __init__(self, root):
+                CqlVisitor.__init__(self, root)
+                self.terms = []
+            def visitTERM(self, node):
+                self.terms.append(node.children[0])
+                return CqlVisitor.visitTERM(self, node)
+            def visitSCOPED_CLAUSE(self, node):
+                return ['scoped'] + node.visitChildren(self)
+        class CollectingWalker(CqlWalker, CollectingVisitor):
+            pass
+        visitor = CollectingVisitor(parseString('a = b AND (c OR d)'))
+        walker = CollectingWalker(parseString('a = b AND (c OR d)'))
+        self.assertEqual(visitor.visit(), walker.visit())
+        self.assertEqual(['a', 'b', 'c', 'd'], walker.terms)
+        self.assertEqual(['scoped', ['scoped', ['a', ['='], 'b']], 'AND', [[['scoped', ['c'], 'OR', ['scoped', ['d']]]]]], walker.visit()[0])
+
+    def testIdentityVisitorSubclass(self):
+        class UpperIdentity(CqlWalker, CqlIdentityVisitor):
+            def visitTERM(self, node):
+                return TERM(node.children[0].upper())
+        self.assertEqual(parseString('A = B OR "C D"'), UpperIdentity(parseString('a = b OR "c d"')).visit())
+
+    def testDispatchTableOncePerClass(self):
+        class Walker(CqlWalker):
+            def visitTERM(self, node):
+                return 'term'
+        Walker(parseString('a')).visit()
+        table = Walker._table
+        self.assertTrue(table is Walker.__dict__['_table'])
+        Walker(parseString('b')).visit()
+        self.assertTrue(table is Walker._table)
+        self.assertEqual(Walker.visitTERM, table[TERM])
+        self.assertEqual([[['term']]], Walker(parseString('a')).visit())
+
+    def testClausesAreVisitedBottomUp(self):
+        class OrderWalker(CqlWalker):
+            def __init__(self, root):
+                CqlWalker.__init__(self, root)
+                self.visited = []
+            def visitSEARCH_CLAUSE(self, node):
+                results = node.visitChildren(self)
+                self.visited.append('()' if node.children[0].name == 'CQL_QUERY' else results[0])
+                return results
+        walker = OrderWalker(parseString('a AND (b OR (c))'))
+        walker.visit()
+        self.assertEqual(['a', 'b', 'c', '()', '()'], walker.visited)
+
+    def testSharedClauses(self):
+        class ListWalker(CqlWalker):
+            def visitSEARCH_CLAUSE(self, node):
+                return node.visitChildren(self)
+        clause = parseString('(a OR b)').children[0].children[0]
+        tree = CQL_QUERY(SCOPED_CLAUSE(SCOPED_CLAUSE(clause), BOOLEAN('or'), SCOPED_CLAUSE(clause, BOOLEAN('and'), clause)))
+        result = ListWalker(tree).visit()
+        self.assertEqual(CqlVisitor(tree).visit(), result)
+        first, second, third = result[0][0][0], result[0][2][0], result[0][2][2]
+        self.assertFalse(first is second or second is third or first is third)
+
+    def testAttributesOfSubclasses(self):
+        class StateVisitor(CqlVisitor):
+            def __init__(self, root):
+                CqlVisitor.__init__(self, root)
+                self._visited = []
+                self._dispatch = None
+                self._table = None
+            def visitTERM(self, node):
+                self._visited.append(node.children[0])
+                return node.children[0]
+        class StateWalker(CqlWalker, StateVisitor):
+            pass
+        for visitorClass in [StateVisitor, StateWalker]:
+            visitor = visitorClass(parseString('a AND (b OR c)'))
+            self.assertEqual(CqlVisitor(parseString('a AND (b OR c)')).visit(), visitor.visit())
+            self.assertEqual(['a', 'b', 'c'], sorted(visitor._visited))
+
+    def testVisitSubtree(self):
+        query = parseString('a = b')
+        index = query.children[0].children[0].children[0]
+        self.assertEqual('a', CqlWalker(index).visit())
+
+    def testDeepTrees(self):
+        class IdentityWalker(CqlWalker, CqlIdentityVisitor):
+            pass
+        query = ' OR '.join('(a%d AND b)' % i for i in range(3000))
+        self.assertEqual(parseString(query), IdentityWalker(parseString(query)).visit())
+        query = '(' * 2000 + query + ')' * 2000
+        self.assertEqual(cql2string(parseString(query)), cql2string(IdentityWalker(parseString(query)).visit()))
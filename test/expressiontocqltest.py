@@ -0,0 +1,73 @@
+## begin license ##
+#
+# "CQLParser" is a parser that builds a parsetree for the given CQL and can convert this into other formats.
+#
+# Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+#
+# This file is part of "CQLParser"
+#
+# "CQLParser" is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# "CQLParser" is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with "CQLParser"; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+## end license ##
+
+from unittest import TestCase
+
+from cqlparser import cqlToExpression, expressionToCql, QueryExpression
+
+
+class ExpressionToCqlTest(TestCase):
+    def testSearchTerm(self):
+        self.assertEqual('value', expressionToCql(QueryExpression.searchterm(term='value')))
+        self.assertEqual('field=value', expressionToCql(QueryExpression.searchterm(index='field', relation='=', term='value')))
+        self.assertEqual('field exact value', expressionToCql(QueryExpression.searchterm(index='field', relation='exact', term='value')))
+        self.assertEqual('field =/boost=1.5 value', expressionToCql(QueryExpression.searchterm(index='field', relation='=', term='value', boost=1.5)))
+
+    def testQuoting(self):
+        self.assertEqual('"two words"', expressionToCql(QueryExpression.searchterm(term='two words')))
+        self.assertEqual('"a \\"quote\\""', expressionToCql(cqlToExpression('"a \\"quote\\""')))
+        self.assertEqual('""', expressionToCql(QueryExpression.searchterm(term='')))
+        self.assertEqual('"and" OR "exact"', expressionToCql(cqlToExpression('"and" OR "exact"')))
+
+    def testNesting(self):
+        self.assertEqual('a AND (b OR c)', expressionToCql(cqlToExpression('a AND (b OR c)')))
+        self.assertEqual('(a AND b) OR c', expressionToCql(cqlToExpression('a AND b OR c')))
+        self.assertEqual('a AND b AND c', expressionToCql(cqlToExpression('a AND (b AND c)')))
+
+    def testMustNot(self):
+        self.assertEqual('a NOT b NOT (c OR d)', expressionToCql(cqlToExpression('a NOT b NOT (c OR d)')))
+        expression = QueryExpression.nested('AND')
+        expression.operands = [QueryExpression.searchterm(term='a', boost=None), QueryExpression.searchterm(term='b')]
+        expression.operands[0].must_not = True
+        self.assertEqual('b NOT a', expressionToCql(expression))
+        expression.operands[1].must_not = True
+        self.assertRaises(ValueError, lambda: expressionToCql(expression))
+        expression.operator = 'OR'
+        expression.operands[0].must_not = False
+        self.assertRaises(ValueError, lambda: expressionToCql(expression))
+        self.assertRaises(ValueError, lambda: expressionToCql(expression.operands[1]))
+
+    def testRoundTrip(self):
+        for cql in [
+                'title=aap',
+                'dc.title =/boost=2 "noot mies" AND (year > 2000 OR year < 1900) NOT type=book',
+                '(a NOT b) OR (c NOT (d AND e))',
+                'x any "a (b)"',
+            ]:
+            expression = cqlToExpression(cql)
+            self.assertEqual(expression, cqlToExpression(expressionToCql(expression)))
+
+    def testLongExpression(self):
+        expression = cqlToExpression(' OR '.join('(a%d AND b NOT c)' % i for i in range(2000)))
+        self.assertEqual(expression, cqlToExpression(expressionToCql(expression)))
@@ -0,0 +1,170 @@
+## begin license ##
+#
+# "CQLParser" is a parser that builds a parsetree for the given CQL and can convert this into other formats.
+#
+# Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+#
+# This file is part of "CQLParser"
+#
+# "CQLParser" is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# "CQLParser" is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with "CQLParser"; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+## end license ##
+
+from unittest import TestCase
+from threading import Thread
+
+from cqlparser import ParseCache, InterningCqlBuilder, CompactCql, CompactCqlBuilder, cql2string, parseString, cqlToExpression, UnsupportedCQL, CQLParseException, CQLLimitException, CQLTokenLimitException, CQLLengthLimitException
+
+
+class ParseCacheTest(TestCase):
+    def testParseString(self):
+        cache = ParseCache()
+        result = cache.parseString('a AND b')
+        self.assertEqual(parseString('a AND b'), result)
+        self.assertTrue(result is cache.parseString('a AND b'))
+        self.assertEqual((1, 1, 0), (cache.hits, cache.misses, cache.evictions))
+
+    def testKeyIncludesParserOptions(self):
+        cache = ParseCache()
+        cache.parseString('field > 200')
+        self.assertRaises(UnsupportedCQL, lambda: cache.parseString('field > 200', supportedComparitors=['=']))
+        cache.parseString('field = 200', supportedComparitors=['='])
+        cache.parseString('field = 200', supportedComparitors=['='])
+        cache.parseString('field =/boost=2 200', supportedModifierNames=['boost'])
+        self.assertRaises(UnsupportedCQL, lambda: cache.parseString('field =/boost=2 200', supportedModifierNames=['other']))
+        self.assertEqual((1, 5), (cache.hits, cache.misses))
+        self.assertEqual(3, len(cache))
+
+    def testSetsOfOptionsInAnyOrder(self):
+        cache = ParseCache()
+        cache.parseString('field = 200', supportedComparitors={'=', 'exact', 'any'})
+        cache.parseString('field = 200', supportedComparitors=frozenset(['any', 'exact', '=']))
+        comparitors = set(['=', 'exact', 'any', 'all'] + ['c%d' % i for i in range(100)])
+        for i in range(100):
+            comparitors.remove('c%d' % i)
+        comparitors.remove('all')
+        cache.parseString('field = 200', supportedComparitors=comparitors)
+        self.assertEqual((2, 1), (cache.hits, cache.misses))
+
+    def testErrorsAreNotCached(self):
+        cache = ParseCache()
+        self.assertRaises(CQLParseException, lambda: cache.parseString('a AND'))
+        self.assertRaises(CQLParseException, lambda: cache.parseString('a AND'))
+        self.assertEqual((0, 2), (cache.hits, cache.misses))
+        self.assertEqual(0, len(cache))
+
+    def testLeastRecentlyUsedIsEvicted(self):
+        cache = ParseCache(size=2)
+        first = cache.parseString('a')
+        cache.parseString('b')
+        cache.parseString('a')
+        cache.parseString('c')
+        self.assertEqual(1, cache.evictions)
+        self.assertTrue(first is cache.parseString('a'))
+        cache.parseString('b')
+        self.assertEqual((2, 4, 2), (cache.hits, cache.misses, cache.evictions))
+        cache.clear()
+        self.assertEqual(0, len(cache))
+
+    def testCqlToExpressionReturnsCopies(self):
+        cache = ParseCache()
+        expression = cache.cqlToExpression('a AND b NOT c')
+        self.assertEqual(cqlToExpression('a AND b NOT c'), expression)
+        expression.operands[2].must_not = False
+        expression.operands.append(cqlToExpression('d'))
+        self.assertEqual(cqlToExpression('a AND b NOT c'), cache.cqlToExpression('a AND b NOT c'))
+        self.assertEqual((1, 1), (cache.hits, cache.misses))
+        self.assertEqual(1, len(cache))
+        self.assertEqual(cqlToExpression(parseString('a =/boost=2 b')), cache.cqlToExpression('a =/boost=2 b', supportedModifierNames=['boost']))
+        self.assertRaises(UnsupportedCQL, lambda: cache.cqlToExpression('a =/boost=2 b', supportedModifierNames=['other']))
+
+    def testNormalize(self):
+        cache = ParseCache(normalize=True)
+        result = cache.parseString('title = "aap" AND noot')
+        self.assertTrue(result is cache.parseString('title="aap"   and "noot"'))
+        self.assertTrue(result is cache.parseString(' title =aap AnD noot '))
+        self.assertEqual(parseString('title = "aap" AND "AND"'), cache.parseString('title = "aap" AND "AND"'))
+        self.assertEqual((2, 2), (cache.hits, cache.misses))
+        self.assertEqual(parseString('"and" any b'), cache.parseString('"and" any b'))
+        self.assertRaises(CQLParseException, lambda: cache.parseString('a "any" b'))
+        self.assertEqual(parseString('a any b'), cache.parseString('a any b'))
+
+    def testCanonicalKeyOnceForEverySpelling(self):
+        from cqlparser import parsecache
+        keys = []
+        def canonicalKey(*args, **kwargs):
+            keys.append(args[0])
+            return originalKey(*args, **kwargs)
+        originalKey, parsecache.canonicalKey = parsecache.canonicalKey, canonicalKey
+        try:
+            cache = ParseCache(normalize=True)
+            for query in ['a AND b', 'a AND b', 'a   AND b', 'a   AND b', 'a AND b']:
+                cache.parseString(query)
+        finally:
+            parsecache.canonicalKey = originalKey
+        self.assertEqual(['a AND b', 'a   AND b'], keys)
+        self.assertEqual((4, 1), (cache.hits, cache.misses))
+        self.assertEqual(3, len(cache))
+
+    def testBuilder(self):
+        builder = InterningCqlBuilder()
+        cache = ParseCache(newBuilder=lambda: builder)
+        first = cache.parseString('dc.title = aap')
+        second = cache.parseString('dc.title = noot')
+        self.assertEqual(parseString('dc.title = noot'), second)
+        self.assertTrue(first.children[0].children[0].children[0] is second.children[0].children[0].children[0])
+
+    def testCompactCql(self):
+        cache = ParseCache(newBuilder=CompactCqlBuilder)
+        first = cache.parseString('a AND b')
+        self.assertTrue(isinstance(first, CompactCql))
+        self.assertEqual('x=y', cql2string(cache.parseString('x = y')))
+        self.assertTrue(first is cache.parseString('a AND b'))
+        self.assertEqual('a AND b', cql2string(first))
+        self.assertEqual(parseString('a AND b'), first.asTree())
+
+    def testLimits(self):
+        cache = ParseCache(normalize=True)
+        cache.parseString('a AND b')
+        self.assertRaises(CQLLimitException, lambda: cache.parseString('a AND b', maxSearchClauses=1))
+        cache.parseString('a AND b', maxLength=7)
+        self.assertRaises(CQLLimitException, lambda: cache.parseString('a   AND b', maxLength=7))
+        self.assertEqual(parseString('a and b'), cache.parseString('a and b', maxLength=7))
+        self.assertEqual((1, 4), (cache.hits, cache.misses))
+
+    def testLimitsBeforeCanonicalKey(self):
+        cache = ParseCache(normalize=True)
+        self.assertRaises(CQLTokenLimitException, lambda: cache.parseString('a ' * 200000, maxTokens=10))
+        self.assertRaises(CQLLengthLimitException, lambda: cache.parseString('a ' * 200000, maxLength=10))
+        self.assertEqual(0, len(cache))
+
+    def testThreads(self):
+        cache = ParseCache(size=10)
+        queries = ['term%d AND other' % (i % 20) for i in range(1000)]
+        errors = []
+        def run():
+            try:
+                for query in queries:
+                    self.assertEqual(parseString(query), cache.parseString(query))
+            except Exception as e:
+                errors.append(e)
+        threads = [Thread(target=run) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([], errors)
+        self.assertEqual(4000, cache.hits + cache.misses)
+        self.assertEqual(10, len(cache))
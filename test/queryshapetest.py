@@ -0,0 +1,127 @@
+## begin license ##
+#
+# "CQLParser" is a parser that builds a parsetree for the given CQL and can convert this into other formats.
+#
+# Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+#
+# This file is part of "CQLParser"
+#
+# "CQLParser" is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# "CQLParser" is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with "CQLParser"; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+## end license ##
+from unittest import TestCase
+
+from cqlparser import parameterize, QueryShape, prepare, CqlTemplate, ParserProfile, parseString, cqlToExpression, cql2string, CompactCql, UnsupportedCQL
+
+
+class QueryShapeTest(TestCase):
+    def testTree(self):
+        shape, values = parameterize(parseString('dc.title=aap AND year>2000'))
+        self.assertEqual(['aap', '2000'], values)
+        self.assertEqual('dc.title=$1 AND year > $2', str(shape))
+        self.assertEqual(2, len(shape))
+        self.assertEqual(parseString('dc.title=aap AND year>2000'), shape.build(values))
+        self.assertEqual(parseString('dc.title="noot mies" AND year>1999'), shape.build(['noot mies', '1999']))
+        self.assertEqual(parseString('dc.title=$1 AND year>$2'), shape.template)
+
+    def testSameShape(self):
+        shapes = {}
+        for query in ['dc.title=aap AND year>2000', 'dc.title = noot and year > 1999', 'dc.title=aap AND year>=2000', 'aap AND year>2000', 'a =/boost=2 b', 'a =/boost=3 b']:
+            shape, values = parameterize(parseString(query))
+            shapes.setdefault(shape, []).append(query)
+        self.assertEqual([['dc.title=aap AND year>2000', 'dc.title = noot and year > 1999'], ['dc.title=aap AND year>=2000'], ['aap AND year>2000'], ['a =/boost=2 b'], ['a =/boost=3 b']], list(shapes.values()))
+        self.assertEqual(parameterize(CompactCql.fromString('a OR b'))[0], parameterize(parseString('c OR d'))[0])
+
+    def testBuildSharesConstantParts(self):
+        shape, values = parameterize(parseString('dc.title=aap'))
+        first, second = shape.build(['a']), shape.build(['b'])
+        firstClause, secondClause = first.children[0].children[0], second.children[0].children[0]
+        self.assertFalse(firstClause is secondClause)
+        self.assertTrue(firstClause.children[0] is secondClause.children[0])
+        self.assertEqual('dc.title=b', cql2string(second))
+        self.assertRaises(ValueError, lambda: shape.build([]))
+
+    def testExpression(self):
+        expression = cqlToExpression('dc.title=aap AND (year>2000 OR b =/boost=2 c) NOT d')
+        shape, values = parameterize(expression)
+        self.assertEqual(['aap', '2000', 'c', 'd'], values)
+        self.assertEqual(expression, shape.build(values))
+        self.assertEqual(cqlToExpression('dc.title=w AND (year>x OR b =/boost=2 y) NOT z'), shape.build(['w', 'x', 'y', 'z']))
+        self.assertEqual(shape, parameterize(cqlToExpression('dc.title=a AND (year>b OR b =/boost=2 c) NOT d'))[0])
+        self.assertNotEqual(shape, parameterize(cqlToExpression('dc.title=a AND (year>b OR b =/boost=2 c) AND d'))[0])
+        self.assertNotEqual(shape, parameterize(parseString('dc.title=a AND (year>b OR b =/boost=2 c) NOT d'))[0])
+        self.assertEqual('dc.title=$1 AND (year > $2 OR b =/boost=2.0 $3) NOT $4', str(shape))
+        self.assertFalse(shape.build(values) is shape.build(values))
+
+    def testLongQuery(self):
+        query = ' OR '.join('t%d' % i for i in range(5000))
+        shape, values = parameterize(parseString(query))
+        self.assertEqual(['t%d' % i for i in range(5000)], values)
+        self.assertEqual(parseString(query), shape.build(values))
+        shape, values = parameterize(cqlToExpression(query))
+        self.assertEqual(cqlToExpression(query), shape.build(values))
+
+
+class CqlTemplateTest(TestCase):
+    def testBind(self):
+        template = prepare('dc.title=$title AND rec.type=$type')
+        self.assertEqual(('title', 'type'), template.names)
+        self.assertEqual('dc.title=$title AND rec.type=$type', str(template))
+        self.assertEqual(parseString('dc.title=aap AND rec.type=book'), template.bind(title='aap', type='book'))
+        self.assertEqual(cqlToExpression('dc.title=aap AND rec.type=book'), template.bindExpression(title='aap', type='book'))
+
+    def testValuesAreSearchTerms(self):
+        template = prepare('dc.title=$title OR $any')
+        self.assertEqual(parseString('dc.title="a OR b" OR "x=y"'), template.bind(title='a OR b', any='x=y'))
+        self.assertEqual('dc.title="a OR b" OR "\\"quoted\\""', cql2string(template.bind(title='a OR b', any='"quoted"')))
+        self.assertEqual(cqlToExpression('dc.title="a OR b" OR "x=y"'), template.bindExpression(title='a OR b', any='x=y'))
+        self.assertEqual(parseString('dc.title=2000 OR a'), template.bind(title=2000, any='a'))
+
+    def testFixedTermsAndRepeatedNames(self):
+        template = prepare('(dc.title=$word OR dc.description=$word) NOT rec.type=book')
+        self.assertEqual(('word',), template.names)
+        self.assertEqual(parseString('(dc.title=a OR dc.description=a) NOT rec.type=book'), template.bind(word='a'))
+        self.assertEqual(cqlToExpression('(dc.title=a OR dc.description=a) NOT rec.type=book'), template.bindExpression(word='a'))
+
+    def testWrongValues(self):
+        template = prepare('dc.title=$title AND rec.type=$type')
+        self.assertRaises(ValueError, lambda: template.bind(title='a'))
+        self.assertRaises(ValueError, lambda: template.bind(title='a', type='b', other='c'))
+        self.assertRaises(ValueError, lambda: template.bindExpression())
+
+    def testProfile(self):
+        profile = ParserProfile(supportedModifierNames=['boost'])
+        self.assertEqual(cqlToExpression('a =/boost=2 b'), prepare('a =/boost=2 $term', profile=profile).bindExpression(term='b'))
+        self.assertRaises(UnsupportedCQL, lambda: prepare('a =/boost=2 $term', profile=ParserProfile(supportedModifierNames=[])))
+
+    def testBindSharesNodesWithoutPlaceholders(self):
+        template = prepare('(a OR b) AND dc.title=$title')
+        tree = template.bind(title='c')
+        self.assertEqual(parseString('(a OR b) AND dc.title=c'), tree)
+        lhs, boolean, rhs = tree.children[0].children
+        self.assertTrue(lhs is template.bind(title='d').children[0].children[0])
+        self.assertFalse(rhs is template.bind(title='c').children[0].children[2])
+        template = prepare('a AND b')
+        self.assertTrue(template.bind() is template.bind())
+        self.assertEqual(parseString('a AND b'), template.bind())
+
+    def testBoundTreesAreNew(self):
+        template = prepare('dc.title=$title')
+        first, second = template.bind(title='a'), template.bind(title='a')
+        self.assertEqual(first, second)
+        self.assertFalse(first is second)
+        first, second = template.bindExpression(title='a'), template.bindExpression(title='a')
+        first.operands = []
+        self.assertEqual('a', second.term)
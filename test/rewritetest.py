@@ -0,0 +1,101 @@
+## begin license ##
+#
+# "CQLParser" is a parser that builds a parsetree for the given CQL and can convert this into other formats.
+#
+# Copyright (C) 2026 Seecr (Seek You Too B.V.) https://seecr.nl
+#
+# This file is part of "CQLParser"
+#
+# "CQLParser" is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# "CQLParser" is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with "CQLParser"; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+## end license ##
+from unittest import TestCase
+
+from cqlparser import rewrite, parseString, cqlToExpression, cql2string, CompactCql, QueryExpression
+from cqlparser.cqlparser import INDEX, TERM, SEARCH_CLAUSE
+
+
+class RewriteTest(TestCase):
+    def testNothingChanged(self):
+        tree = parseString('a = b AND (c OR d)')
+        self.assertTrue(rewrite(tree, lambda node: node) is tree)
+        expression = cqlToExpression('a = b AND (c OR d)')
+        self.assertTrue(rewrite(expression, lambda expression: expression) is expression)
+
+    def testIndexAlias(self):
+        aliases = {'title': 'dc.title'}
+        def alias(node):
+            name = node.children[0].children[0]
+            return INDEX(TERM(aliases[name])) if name in aliases else node
+        tree = parseString('title = a AND (creator = b OR subject = c)')
+        result = rewrite(tree, alias, nodeClasses=(INDEX,))
+        self.assertEqual(parseString('dc.title = a AND (creator = b OR subject = c)'), result)
+        self.assertEqual(parseString('title = a AND (creator = b OR subject = c)'), tree)
+        [scoped] = tree.children
+        [newScoped] = result.children
+        self.assertFalse(scoped is newScoped)
+        self.assertFalse(scoped.children[0] is newScoped.children[0])
+        self.assertTrue(scoped.children[1] is newScoped.children[1])
+        self.assertTrue(scoped.children[2] is newScoped.children[2])
+
+    def testTransformSeesRewrittenChildren(self):
+        seen = []
+        def upper(node):
+            seen.append(node.name)
+            if node.__class__ is TERM:
+                return TERM(node.children[0].upper())
+            return node
+        result = rewrite(parseString('a = b'), upper)
+        self.assertEqual(parseString('A = B'), result)
+        self.assertEqual(['TERM', 'INDEX', 'COMPARITOR', 'RELATION', 'TERM', 'SEARCH_TERM', 'SEARCH_CLAUSE', 'SCOPED_CLAUSE', 'CQL_QUERY'], seen)
+        self.assertEqual('A=B', cql2string(rewrite(CompactCql.fromString('a = b'), upper)))
+
+    def testSharedReplacement(self):
+        replacement = parseString('(c OR d)').children[0].children[0]
+        x = parseString('x').children[0].children[0]
+        def replace(node):
+            return replacement if node == x else node
+        for query in ['x OR x', 'x NOT x', 'a AND (x OR x) OR x']:
+            tree = rewrite(parseString(query), replace, nodeClasses=(SEARCH_CLAUSE,))
+            self.assertEqual(cqlToExpression(cql2string(tree)), cqlToExpression(tree))
+            self.assertEqual(cqlToExpression(cql2string(tree)), cqlToExpression(CompactCql.fromTree(tree)))
+        self.assertEqual(['c', 'd', 'c', 'd'], [operand.term for operand in cqlToExpression(rewrite(parseString('x OR x'), replace, nodeClasses=(SEARCH_CLAUSE,))).operands])
+
+    def testExpression(self):
+        expression = cqlToExpression('title = a AND (creator = b OR subject = c) NOT d')
+        original = expression.copy()
+        def mapField(expression):
+            if expression.isSearchterm() and expression.index == 'creator':
+                return QueryExpression.searchterm(index='dc.creator', relation=expression.relation, term=expression.term)
+            return expression
+        result = rewrite(expression, mapField)
+        self.assertEqual(cqlToExpression('title = a AND (dc.creator = b OR subject = c) NOT d'), result)
+        self.assertEqual(original, expression)
+        self.assertFalse(result is expression)
+        self.assertTrue(result.operands[0] is expression.operands[0])
+        self.assertFalse(result.operands[1] is expression.operands[1])
+        self.assertTrue(result.operands[1].operands[1] is expression.operands[1].operands[1])
+        self.assertTrue(result.operands[2] is expression.operands[2])
+        self.assertTrue(result.operands[2].must_not)
+
+    def testLongQuery(self):
+        query = ' OR '.join('t%d' % i for i in range(5000))
+        tree = parseString(query)
+        result = rewrite(tree, lambda node: TERM('x') if node.children[0] == 't4999' else node, nodeClasses=(TERM,))
+        self.assertEqual(parseString(query.replace('t4999', 'x')), result)
+        expression = cqlToExpression(query)
+        result = rewrite(expression, lambda e: QueryExpression.searchterm(term='x') if e.isSearchterm() and e.term == 't0' else e)
+        self.assertEqual('x', result.operands[0].term)
+        self.assertTrue(all(a is b for a, b in zip(result.operands[1:], expression.operands[1:])))